@@ -1,3 +1,6 @@
+import functools
+import re
+
 from baseClasses import LEARNING_LEVEL
 
 class HSK_LEVEL(LEARNING_LEVEL):
@@ -7,4 +10,43 @@ class HSK_LEVEL(LEARNING_LEVEL):
     HSK_4 = 3
     HSK_5 = 4
     HSK_6 = 5
-    HSK_7_9 = 6
\ No newline at end of file
+    HSK_7_9 = 6
+
+# Every level in order, built once rather than iterating the enum each time
+HSK_LEVELS: tuple[HSK_LEVEL, ...] = tuple(HSK_LEVEL)
+
+# Pinyin normalisation, run when phrases are stored rather than per answer.
+# The per-character work is left to str.translate and a compiled regex, both
+# already in C, so there's no Python loop here worth JIT compiling
+DIACRITIC_TO_VOWEL_TONE = {
+    'ā': ('a', 1), 'ē': ('e', 1), 'ī': ('i', 1), 'ō': ('o', 1), 'ū': ('u', 1), 'ǖ': ('v', 1),
+    'Ā': ('A', 1), 'Ē': ('E', 1), 'Ī': ('I', 1), 'Ō': ('O', 1), 'Ū': ('U', 1), 'Ǖ': ('V', 1),
+    'á': ('a', 2), 'é': ('e', 2), 'í': ('i', 2), 'ó': ('o', 2), 'ú': ('u', 2), 'ǘ': ('v', 2),
+    'Á': ('A', 2), 'É': ('E', 2), 'Í': ('I', 2), 'Ó': ('O', 2), 'Ú': ('U', 2), 'Ǘ': ('V', 2),
+    'ǎ': ('a', 3), 'ě': ('e', 3), 'ǐ': ('i', 3), 'ǒ': ('o', 3), 'ǔ': ('u', 3), 'ǚ': ('v', 3),
+    'Ǎ': ('A', 3), 'Ě': ('E', 3), 'Ǐ': ('I', 3), 'Ǒ': ('O', 3), 'Ǔ': ('U', 3), 'Ǚ': ('V', 3),
+    'à': ('a', 4), 'è': ('e', 4), 'ì': ('i', 4), 'ò': ('o', 4), 'ù': ('u', 4), 'ǜ': ('v', 4),
+    'À': ('A', 4), 'È': ('E', 4), 'Ì': ('I', 4), 'Ò': ('O', 4), 'Ù': ('U', 4), 'Ǜ': ('V', 4)
+}
+# Keyed by code point, like the translation table below, so both can be
+# looked up straight from ord()
+DIACRITIC_TO_TONE = {ord(d): tone for d, (_, tone) in DIACRITIC_TO_VOWEL_TONE.items()}
+# Translation table stripping the tone mark off every vowel in one pass
+DIACRITICS_TO_VOWELS = str.maketrans({d: vowel for d, (vowel, _) in DIACRITIC_TO_VOWEL_TONE.items()})
+# Pinyin markup is a flat run of <span class="toneN">syllable</span>
+SPAN_REGEX = re.compile(r"<span[^>]*>([^<]*)</span>")
+
+@functools.lru_cache(maxsize=2048)
+def convertDiacriticToNumber(pinyin: str) -> str:
+    """Given a character in pinyin with an accent, change it to the numbered form"""
+    # Tones are never 0, so the first non-None lookup is the syllable's tone
+    tone = next(filter(None, map(DIACRITIC_TO_TONE.get, map(ord, pinyin))), 5)
+    return f"{pinyin.translate(DIACRITICS_TO_VOWELS)}{tone}"
+
+def getPinyinBetweenTags(markup: str) -> str:
+    """Gets pinyin content between markup language tags"""
+    return "".join(convertDiacriticToNumber(m.group(1)) for m in SPAN_REGEX.finditer(markup))
+
+def normalizePinyin(markup: str) -> str:
+    """Converts pinyin markup to the casefolded numbered form answers are checked against"""
+    return getPinyinBetweenTags(markup).casefold()
@@ -1,74 +1,83 @@
 # chineseDatabase.py - interacts with DB
 
+from collections import defaultdict
+import csv
+from dataclasses import dataclass
+from operator import methodcaller
 import sys
 
+# Only needed to build a database, so spare the GUI importing them
 if __name__ == "__main__":
+    from concurrent.futures import ProcessPoolExecutor
     from PySide6.QtWidgets import QApplication
 from PySide6.QtSql import QSqlQuery
 
-from chineseClasses import HSK_LEVEL
+from chineseClasses import HSK_LEVEL, HSK_LEVELS, normalizePinyin
 from database import *
 
 USAGE = f"python {sys.argv[0]} <dbFile.db> <vocab1.txt> <data1.tsv> [<vocab2.txt> <data2.tsv>]..."
 
+@dataclass(slots=True, frozen=True)
 class ChineseData(Data):
-    def __init__(self,
-                 simplified: str, 
-                 traditional: str,
-                 pinyin: str, 
-                 english: str, 
-                 classifier: str, 
-                 taiwanPinyin: str, 
-                 wordsWithSamePinyin: str) -> None:
-        super().__init__()
-        self.simplified = simplified
-        self.traditional = traditional
-        self.pinyin = pinyin
-        self.english = english
-        self.classifier = classifier
-        self.taiwanPinyin = taiwanPinyin
-        self.wordsWithSamePinyin = wordsWithSamePinyin
+    simplified: str
+    traditional: str
+    pinyin: str
+    english: str
+    classifier: str
+    taiwanPinyin: str
+    wordsWithSamePinyin: str
 
     @classmethod
     def fromDelimitedString(cls, data: str, separator: str='\t'):
         """Create a ChineseData object given a delimited string"""
-        entry = data.split(separator)
+        return cls.fromFields(data.split(separator))
+
+    @classmethod
+    def fromFields(cls, entry: list[str]):
+        """Create a ChineseData object given already split fields"""
         if len(entry) < 7:
             raise IndexError("Not enough data")
-        return cls(
-            entry[0].strip(),
-            entry[1].strip(),
-            entry[2].strip(),
-            entry[3].strip(),
-            entry[4].strip(),
-            entry[5].strip(),
-            entry[6].strip()
-        )
+        return cls(*[field.strip() for field in entry[:7]])
 
+@dataclass(slots=True, frozen=True)
 class ChineseDataWithStats(ChineseData):
-    def __init__(self,
-                 id: int,
-                 simplified: str,
-                 traditional: str,
-                 pinyin: str,
-                 english: str,
-                 classifier: str,
-                 taiwanPinyin: str,
-                 wordsWithSamePinyin: str,
-                 timesSeen: int,
-                 timesCorrect: int,
-                 lastTimeSeen: str,
-                 lastTimeCorrect: str,
-                 dueDate: str,
-                 easeFactor: float) -> None:
-        super().__init__(simplified, traditional, pinyin, english, classifier, taiwanPinyin, wordsWithSamePinyin)
-        self.id = id
-        self.timesSeen = timesSeen
-        self.timesCorrect = timesCorrect
-        self.lastTimeSeen = lastTimeSeen
-        self.lastTimeCorrect = lastTimeCorrect
-        self.dueDate = dueDate
-        self.easeFactor = easeFactor
+    # Follows the fields of ChineseData
+    id: int
+    timesSeen: int
+    timesCorrect: int
+    lastTimeSeen: str
+    lastTimeCorrect: str
+    dueDate: str
+    easeFactor: float
+    pinyinNormalized: str # Lowercase numbered pinyin, see normalizePinyin()
+
+def _buildChineseDataWithStats(r: QSqlQuery) -> ChineseDataWithStats:
+    """Packages a row of all chinesePhrases columns (id first) into a ChineseDataWithStats"""
+    value = r.value
+    return ChineseDataWithStats(
+        value(1), # simplified
+        value(2), # traditional
+        value(3), # pinyin
+        value(4), # english
+        value(5), # classifier
+        value(6), # taiwanPinyin
+        value(7), # wordsWithSamePinyin
+        value(0), # id
+        value(8), # timesSeen
+        value(9), # timesCorrect
+        value(10),# lastTimeSeen
+        value(11),# lastTimeCorrect
+        value(12),# dueDate
+        value(13),# easeFactor
+        value(14) # pinyinNormalized
+    )
+
+# Packages single column rows, e.g. IDs
+_buildFirstValue = methodcaller("value", 0)
+
+def _buildFirstTwoValues(r: QSqlQuery) -> tuple[object, object]:
+    """Packages two column rows, e.g. (ordinalID, id) pairs"""
+    return (r.value(0), r.value(1))
 
 class ChineseDB(Database):
     bands = {
@@ -81,329 +90,431 @@ class ChineseDB(Database):
         HSK_LEVEL.HSK_7_9: "hsk7-9"
     }
 
-    def __init__(self, dbName: str) -> None:
-        super().__init__(dbName)
+    # SQL text is kept here so each statement only needs to be prepared once
+    # and can then be looked up by its text in the prepared statement cache
+    SQL_DELETE_PHRASE = """
+        UPDATE chinesePhrases
+        SET
+            deleted = 1
+        WHERE
+            id = ?;
+        """
 
-    def deletePhrase(self, id: int) -> bool:
-        """Deletes given phrase via ID"""
-        return self._execQueryNoResults(
-            query="""
-            UPDATE chinesePhrases
-            SET
-                deleted = 1
-            WHERE
-                id = :_id;
-            """,
-            _id=id
-        )
+    SQL_GET_PHRASE_BY_ID = """
+        SELECT
+            id,
+            simplified,
+            traditional,
+            pinyin,
+            english,
+            classifier,
+            taiwanPinyin,
+            wordsWithSamePinyin,
+            timesSeen,
+            timesCorrect,
+            lastTimeSeen,
+            lastTimeCorrect,
+            dueDate,
+            easeFactor,
+            pinyinNormalized
+        FROM
+            chinesePhrases
+        WHERE
+            id = ?;
+        """
 
-    def getPhraseById(self, id: int) -> ChineseDataWithStats | None:
-        """Returns the datum associated with the given ID if exists"""
-        result = self._execQueryGetResults(
-            query="""
-            SELECT
-                id,
-                simplified,
-                traditional,
-                pinyin,
-                english,
-                classifier,
-                taiwanPinyin,
-                wordsWithSamePinyin,
-                timesSeen,
-                timesCorrect,
-                lastTimeSeen,
-                lastTimeCorrect,
-                dueDate,
-                easeFactor
-            FROM
-                chinesePhrases
-            WHERE
-                id = :_id;
-            """,
-            constructor=lambda r: ChineseDataWithStats(
-                r.value(0), # id
-                r.value(1), # simplified
-                r.value(2), # traditional
-                r.value(3), # pinyin
-                r.value(4), # english
-                r.value(5), # classifier
-                r.value(6), # taiwanPinyin
-                r.value(7), # wordsWithSamePinyin
-                r.value(8), # timesSeen
-                r.value(9), # timesCorrect
-                r.value(10),# lastTimeSeen
-                r.value(11),# lastTimeCorrect
-                r.value(12),# dueDate
-                r.value(13) # easeFactor
-            ),
-            _id=id
-        )
-        return result[0] if result else None
+    SQL_GET_PHRASES = """
+        SELECT
+            id,
+            simplified,
+            traditional,
+            pinyin,
+            english,
+            classifier,
+            taiwanPinyin,
+            wordsWithSamePinyin,
+            timesSeen,
+            timesCorrect,
+            lastTimeSeen,
+            lastTimeCorrect,
+            dueDate,
+            easeFactor,
+            pinyinNormalized
+        FROM
+            chinesePhrases
+        WHERE
+            band = ? AND
+            ordinalID <= ? AND
+            deleted = 0
+        LIMIT ?
+        ;
+        """
 
-    def getPhrases(self, level: HSK_LEVEL, maxOrdinalID: int, limit: int=None) -> list[ChineseDataWithStats]:
-        """Gets a list of phrase data given a particular level and an upper bound in that level"""
-        if limit is not None and not isinstance(limit, int) and limit < 0:
-            raise ValueError
-        return self._execQueryGetResults(
-            query=f"""
-            SELECT
-                id,
-                simplified,
-                traditional,
-                pinyin,
-                english,
-                classifier,
-                taiwanPinyin,
-                wordsWithSamePinyin,
-                timesSeen,
-                timesCorrect,
-                lastTimeSeen,
-                lastTimeCorrect,
-                dueDate,
-                easeFactor
-            FROM
-                chinesePhrases
-            WHERE
-                band = :_band AND
-                ordinalID <= :_maxOrdinalID AND
-                deleted = 0
-            {"LIMIT :_limit" if limit is not None else ""}
-            ;
-            """,
-            constructor=lambda r: ChineseDataWithStats(
-                r.value(0), # id
-                r.value(1), # simplified
-                r.value(2), # traditional
-                r.value(3), # pinyin
-                r.value(4), # english
-                r.value(5), # classifier
-                r.value(6), # taiwanPinyin
-                r.value(7), # wordsWithSamePinyin
-                r.value(8), # timesSeen
-                r.value(9), # timesCorrect
-                r.value(10),# lastTimeSeen
-                r.value(11),# lastTimeCorrect
-                r.value(12),# dueDate
-                r.value(13) # easeFactor
-            ),
-            _band=ChineseDB.bands[level],
-            _maxOrdinalID=maxOrdinalID,
-            _limit=limit
-        )
+    SQL_GET_PHRASE_IDS = """
+        SELECT
+            id
+        FROM
+            chinesePhrases
+        WHERE
+            band = ? AND
+            ordinalID <= ? AND
+            deleted = 0
+        LIMIT ?
+        ;
+        """
 
-    def getPhrasesDueToday(self, level: HSK_LEVEL, maxOrdinalID: int, limit: int=None) -> list[Data]:
-        """Gets a list of phrases that are due today (i.e. date <= now())"""
-        if limit is not None and not isinstance(limit, int) and limit < 0:
-            raise ValueError
-        return self._execQueryGetResults(
-            query=f"""
+    SQL_GET_PHRASE_ORDINAL_IDS = """
+        SELECT
+            ordinalID,
+            id
+        FROM
+            chinesePhrases
+        WHERE
+            band = ? AND
+            deleted = 0
+        ORDER BY
+            ordinalID
+        ;
+        """
+
+    SQL_GET_PHRASES_DUE_TODAY = """
+        SELECT
+            id,
+            simplified,
+            traditional,
+            pinyin,
+            english,
+            classifier,
+            taiwanPinyin,
+            wordsWithSamePinyin,
+            timesSeen,
+            timesCorrect,
+            lastTimeSeen,
+            lastTimeCorrect,
+            dueDate,
+            easeFactor,
+            pinyinNormalized
+        FROM
+            chinesePhrases
+        WHERE
+            band = ? AND
+            ordinalID <= ? AND
+            (
+                dueDate <= ? OR
+                dueDate is NULL
+            ) AND
+            deleted = 0
+        ORDER BY
+            dueDate DESC
+        LIMIT ?
+        ;
+        """
+
+    SQL_GET_PHRASE_IDS_DUE_TODAY = """
+        SELECT
+            id
+        FROM
+            chinesePhrases
+        WHERE
+            band = ? AND
+            ordinalID <= ? AND
+            (
+                dueDate <= ? OR
+                dueDate is NULL
+            ) AND
+            deleted = 0
+        ORDER BY
+            dueDate DESC
+        LIMIT ?
+        ;
+        """
+
+    # Samples in SQL so only the chosen ID crosses over into Python
+    SQL_GET_RANDOM_PHRASE_ID_DUE_TODAY = """
+        SELECT
+            id
+        FROM
+        (
             SELECT
-                id,
-                simplified,
-                traditional,
-                pinyin,
-                english,
-                classifier,
-                taiwanPinyin,
-                wordsWithSamePinyin,
-                timesSeen,
-                timesCorrect,
-                lastTimeSeen,
-                lastTimeCorrect,
-                dueDate,
-                easeFactor
+                id
             FROM
                 chinesePhrases
             WHERE
-                band = :_band AND
-                ordinalID <= :_maxOrdinalID AND
+                band = ? AND
+                ordinalID <= ? AND
                 (
-                    dueDate <= date("now") OR
+                    dueDate <= ? OR
                     dueDate is NULL
                 ) AND
                 deleted = 0
             ORDER BY
                 dueDate DESC
-            {"LIMIT :_limit" if limit is not None else ""}
-            ;
-            """
-            ,
-            constructor=lambda r: ChineseDataWithStats(
-                r.value(0), # id
-                r.value(1), # simplified
-                r.value(2), # traditional
-                r.value(3), # pinyin
-                r.value(4), # english
-                r.value(5), # classifier
-                r.value(6), # taiwanPinyin
-                r.value(7), # wordsWithSamePinyin
-                r.value(8), # timesSeen
-                r.value(9), # timesCorrect
-                r.value(10),# lastTimeSeen
-                r.value(11),# lastTimeCorrect
-                r.value(12),# dueDate
-                r.value(13) # easeFactor
-            ),
-            _band=ChineseDB.bands[level],
-            _maxOrdinalID=maxOrdinalID,
-            _limit=limit
+            LIMIT ?
         )
+        ORDER BY
+            RANDOM()
+        LIMIT 1
+        ;
+        """
 
-    def getPhrasesDueTodayCount(self, level: LEARNING_LEVEL, maxOrdinalID: int) -> int:
-        """Returns the number of phrases due today"""
-        return int(self._execQueryGetResult(
-            query="""
+    SQL_GET_PHRASES_DUE_TODAY_COUNT = """
+        SELECT
+            COUNT(1)
+        FROM
+            chinesePhrases
+        WHERE
+            band = ? AND
+            ordinalID <= ? AND
+            (
+                dueDate <= ? OR
+                dueDate is NULL
+            ) AND
+            deleted = 0
+        """
+
+    SQL_GET_PHRASES_WITH_SAME_LOGOGRAPHS = """
+        SELECT
+            id,
+            simplified,
+            traditional,
+            pinyin,
+            english,
+            classifier,
+            taiwanPinyin,
+            wordsWithSamePinyin,
+            timesSeen,
+            timesCorrect,
+            lastTimeSeen,
+            lastTimeCorrect,
+            dueDate,
+            easeFactor,
+            pinyinNormalized
+        FROM
+            chinesePhrases
+        WHERE
+            simplified = ? AND
+            id != ? AND
+            deleted = 0;
+        """
+
+    SQL_GET_PHRASES_WITH_SAME_PINYIN = """
+        SELECT
+            id,
+            simplified,
+            traditional,
+            pinyin,
+            english,
+            classifier,
+            taiwanPinyin,
+            wordsWithSamePinyin,
+            timesSeen,
+            timesCorrect,
+            lastTimeSeen,
+            lastTimeCorrect,
+            dueDate,
+            easeFactor,
+            pinyinNormalized
+        FROM
+            chinesePhrases
+        WHERE
+            pinyinNormalized = ? AND
+            id != ? AND
+            deleted = 0;
+        """
+
+    SQL_GET_RESPONSE_TIME_STATS = """
+        SELECT
+            n,
+            CASE WHEN n > 0 THEN mean ELSE 'NaN' END,
+            CASE WHEN n > 0 THEN m2 / n ELSE 'NaN' END
+        FROM
+            stats
+        WHERE
+            key = 'responseTime';
+        """
+
+    SQL_INSERT_PHRASE = """
+        INSERT OR IGNORE INTO chinesePhrases (
+            band,
+            ordinalID,
+            simplified,
+            traditional,
+            pinyin,
+            english,
+            classifier,
+            taiwanPinyin,
+            wordsWithSamePinyin,
+            pinyinNormalized
+        )
+        VALUES (
+            ?,
+            ?,
+            ?,
+            ?,
+            ?,
+            ?,
+            ?,
+            ?,
+            ?,
+            ?
+        )
+        """
+
+    SQL_INSERT_RESPONSE_TIME = """
+        INSERT OR IGNORE INTO responseTimes (
+            chinesePhraseID,
+            timeStamp,
+            responseTime
+        )
+        VALUES (
+            ?,
+            ?,
+            ?
+        )
+        """
+
+    # Welford's update, where new.x is the response time being logged
+    SQL_UPDATE_RESPONSE_TIME_STATS = """
+        UPDATE stats
+        SET
+            n = n + 1,
+            mean = mean + (new.x - mean) / (n + 1),
+            m2 = m2 + (new.x - mean) * (new.x - mean - (new.x - mean) / (n + 1))
+        FROM
+        (
+            SELECT
+                ?
+            AS
+                x
+        )
+            AS
+                new
+        WHERE
+            key = 'responseTime';
+        """
+
+    # A NULL lastTimeSeen or lastTimeCorrect leaves the stored value untouched
+    SQL_UPDATE_PHRASE = """
+        UPDATE chinesePhrases
+        SET
+            timesCorrect = timesCorrect + ?,
+            lastTimeSeen = COALESCE(?, lastTimeSeen),
+            lastTimeCorrect = COALESCE(?, lastTimeCorrect),
+            dueDate = ?,
+            easeFactor = ?
+        WHERE id = ?;
+        """
+
+    def open(self) -> bool:
+        """
+        Opens database connection and brings databases built by older versions
+        up to date. A brand-new file is left for initializeDB() to set up
+        """
+        result = super().open()
+        if result and self._hasPhrasesTable():
+            if not (self._createPinyinNormalized() and self._createIndexes() and self._createStats()):
+                # Later queries rely on these, so don't report a usable database
+                self.close()
+                raise RuntimeError("Unable to update database to the current schema", self.db)
+        return result
+
+    def _hasPhrasesTable(self) -> bool:
+        """Returns True if the chinesePhrases table has been created"""
+        return bool(self._execQueryGetResult(
+            """
             SELECT
                 COUNT(1)
             FROM
-                chinesePhrases
+                sqlite_master
             WHERE
-                band = :_band AND
-                ordinalID <= :_maxOrdinalID AND
-                (
-                    dueDate <= date("now") OR
-                    dueDate is NULL
-                ) AND
-                deleted = 0
-            """,
-            _band=ChineseDB.bands[level],
-            _maxOrdinalID=maxOrdinalID
+                type = 'table' AND name = 'chinesePhrases';
+            """
         ))
 
-    def getPhrasesWithSameLogographs(self, simplified: str, originalID: int) -> list[ChineseDataWithStats]:
+    def _createPinyinNormalized(self) -> bool:
         """
-        Returns a list of phrases that have the same string of Chinese characters,
-        but exclude the original
-        Ex. 吧 has 3 phrases: ba5, ba1, bia1, perhaps with ID's 0, 1, and 2 resp.
-        getPhrasesWithSameLogographs(吧, 0) returns [(1, 吧 data...), (2, 吧 data...)]
+        Adds and fills in the pinyinNormalized column for databases built
+        before it existed, so answers never have to be parsed out of the
+        pinyin markup while testing
         """
-        return self._execQueryGetResults(
-            query="""
+        hasColumn = self._execQueryGetResult(
+            """
             SELECT
-                id,
-                simplified,
-                traditional,
-                pinyin,
-                english,
-                classifier,
-                taiwanPinyin,
-                wordsWithSamePinyin,
-                timesSeen,
-                timesCorrect,
-                lastTimeSeen,
-                lastTimeCorrect,
-                dueDate,
-                easeFactor
+                COUNT(1)
             FROM
-                chinesePhrases
+                pragma_table_info('chinesePhrases')
             WHERE
-                simplified = :_simplified AND
-                id != :_originalID AND
-                deleted = 0;
-            """,
-            constructor=lambda r: ChineseDataWithStats(
-                r.value(0), # id
-                r.value(1), # simplified
-                r.value(2), # traditional
-                r.value(3), # pinyin
-                r.value(4), # english
-                r.value(5), # classifier
-                r.value(6), # taiwanPinyin
-                r.value(7), # wordsWithSamePinyin
-                r.value(8), # timesSeen
-                r.value(9), # timesCorrect
-                r.value(10),# lastTimeSeen
-                r.value(11),# lastTimeCorrect
-                r.value(12),# dueDate
-                r.value(13) # easeFactor
-            ),
-            _simplified=simplified,
-            _originalID=originalID
+                name = 'pinyinNormalized';
+            """
         )
-
-    def getPhrasesWithSamePinyin(self, pinyin: str, originalID: int) -> list[ChineseDataWithStats]:
-        """
-        Returns a list of phrases that have the same pinyin but exclude the original
-        Ex. tā has 3 phrases: 它, 踏, 塌 perhaps with ID's 0, 1, and 2 resp.
-        getPhrasesWithSamePinyin(<span class="tone1">tā</span>, 0) returns [(1, 踏 data...), (2, 塌 data...)]
-        """
-        return self._execQueryGetResults(
-            query="""
+        if hasColumn:
+            return True
+        if not self._execQueryNoResults(
+            """
+            ALTER TABLE chinesePhrases
+            ADD COLUMN pinyinNormalized TEXT NOT NULL DEFAULT "";
+            """
+        ):
+            return False
+        rows = self._execQueryGetResults(
+            """
             SELECT
                 id,
-                simplified,
-                traditional,
-                pinyin,
-                english,
-                classifier,
-                taiwanPinyin,
-                wordsWithSamePinyin,
-                timesSeen,
-                timesCorrect,
-                lastTimeSeen,
-                lastTimeCorrect,
-                dueDate,
-                easeFactor
+                pinyin
             FROM
-                chinesePhrases
-            WHERE
-                pinyin = :_pinyin AND
-                id != :_originalID AND
-                deleted = 0;
+                chinesePhrases;
             """,
-            constructor=lambda r: ChineseDataWithStats(
-                r.value(0), # id
-                r.value(1), # simplified
-                r.value(2), # traditional
-                r.value(3), # pinyin
-                r.value(4), # english
-                r.value(5), # classifier
-                r.value(6), # taiwanPinyin
-                r.value(7), # wordsWithSamePinyin
-                r.value(8), # timesSeen
-                r.value(9), # timesCorrect
-                r.value(10),# lastTimeSeen
-                r.value(11),# lastTimeCorrect
-                r.value(12),# dueDate
-                r.value(13) # easeFactor
-            ),
-            _pinyin=pinyin,
-            _originalID=originalID
+            _buildFirstTwoValues
         )
-
-    def getResponseTimeAverage(self) -> float:
-        """Returns the average response time"""
-        result = self._execQueryGetResult(
-            query="""
-            SELECT
-                AVG(responseTime)
-            FROM
-                responseTimes;
+        if len(rows) == 0:
+            return True
+        began = self.begin() # False if already within a transaction
+        query = self._prepareQuery(
+            """
+            UPDATE chinesePhrases
+            SET
+                pinyinNormalized = ?
+            WHERE
+                id = ?;
             """
         )
-        if result == "": # Empty table
-            return float("NaN")
-        else:
-            return float(result)
-    
-    def getResponseTimeCount(self) -> int:
-        """Returns the number of response times"""
-        return int(self._execQueryGetResult(
-            query="""
-            SELECT
-                COUNT(1)
-            FROM
-                responseTimes;
+        query.addBindValue([normalizePinyin(pinyin) for _, pinyin in rows])
+        query.addBindValue([id for id, _ in rows])
+        result = query.execBatch()
+        if began:
+            if result:
+                result = self.commit()
+            else:
+                self.rollback()
+        return result
+
+    def _createStats(self) -> bool:
+        """
+        Creates the running response time statistics if they don't exist yet,
+        seeding them from whatever response times are already logged. The
+        statistics are kept up to date by insertResponseTime() using Welford's
+        algorithm so the getters never have to scan responseTimes
+        """
+        return self._execScript(
             """
-        ))
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY NOT NULL,
+                n INTEGER NOT NULL DEFAULT 0,
+                mean REAL NOT NULL DEFAULT 0.0,
+                m2 REAL NOT NULL DEFAULT 0.0
+            );
 
-    def getResponseTimeVariance(self) -> float:
-        """Returns the variance in response times"""
-        result = self._execQueryGetResult(
-            query="""
+            INSERT OR IGNORE INTO stats (
+                key,
+                n,
+                mean,
+                m2
+            )
             SELECT
-                AVG((responseTimes.responseTime - temp.avg) * (responseTimes.responseTime - temp.avg))
+                'responseTime',
+                COUNT(responseTime),
+                COALESCE(AVG(responseTime), 0.0),
+                COALESCE(SUM((responseTime - temp.avg) * (responseTime - temp.avg)), 0.0)
             FROM
                 responseTimes,
             (
@@ -419,17 +530,230 @@ class ChineseDB(Database):
             ;
             """
         )
-        if result == "": # Empty table
-            return float("NaN")
-        else:
-            return float(result)
+
+    def _createIndexes(self) -> bool:
+        """
+        Creates the indexes used by phrase lookups if they don't exist yet.
+        Partial indexes leave out soft-deleted phrases, which are never queried
+        """
+        return self._execScript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_band_ordinalID
+            ON chinesePhrases(band, ordinalID)
+            WHERE deleted = 0;
+
+            CREATE INDEX IF NOT EXISTS idx_simplified
+            ON chinesePhrases(simplified)
+            WHERE deleted = 0;
+
+            CREATE INDEX IF NOT EXISTS idx_pinyinNormalized
+            ON chinesePhrases(pinyinNormalized)
+            WHERE deleted = 0;
+
+            CREATE INDEX IF NOT EXISTS idx_chinesePhraseID
+            ON responseTimes(chinesePhraseID);
+            """
+        )
+
+    def deletePhrase(self, id: int) -> bool:
+        """Deletes given phrase via ID"""
+        self._phraseCache.pop(id, None)
+        return self._execQueryNoResults(
+            ChineseDB.SQL_DELETE_PHRASE,
+            id
+        )
+
+    def getPhraseById(self, id: int) -> ChineseDataWithStats | None:
+        """Returns the datum associated with the given ID if exists"""
+        cache = self._phraseCache
+        # Popped and put back so the dict stays ordered least to most recently used
+        data = cache.pop(id, None)
+        if data is None:
+            data = next(self._execQueryIterResults(
+                ChineseDB.SQL_GET_PHRASE_BY_ID,
+                _buildChineseDataWithStats,
+                id
+            ), None)
+            if data is None:
+                return None
+            if len(cache) >= self._phraseCacheSize:
+                del cache[next(iter(cache))]
+        cache[id] = data
+        return data
+
+    def getPhrases(self, level: HSK_LEVEL, maxOrdinalID: int, limit: int=None) -> list[ChineseDataWithStats]:
+        """Gets a list of phrase data given a particular level and an upper bound in that level"""
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError
+        return self._execQueryGetResults(
+            ChineseDB.SQL_GET_PHRASES,
+            _buildChineseDataWithStats,
+            ChineseDB.bands[level],
+            maxOrdinalID,
+            -1 if limit is None else limit # Negative means no limit
+        )
+
+    def getPhraseIds(self, level: HSK_LEVEL, maxOrdinalID: int, limit: int=None) -> list[int]:
+        """
+        Same as getPhrases() but only fetches the IDs, for when a caller just
+        needs to pick from the phrases rather than read them all
+        """
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError
+        return self._execQueryGetResults(
+            ChineseDB.SQL_GET_PHRASE_IDS,
+            _buildFirstValue,
+            ChineseDB.bands[level],
+            maxOrdinalID,
+            -1 if limit is None else limit # Negative means no limit
+        )
+
+    def getPhraseOrdinalIds(self, level: HSK_LEVEL) -> list[tuple[int, int]]:
+        """Returns every (ordinalID, id) pair in a level, sorted by ordinalID"""
+        return self._execQueryGetResults(
+            ChineseDB.SQL_GET_PHRASE_ORDINAL_IDS,
+            _buildFirstTwoValues,
+            ChineseDB.bands[level]
+        )
+
+    def getPhrasesDueToday(self, level: HSK_LEVEL, maxOrdinalID: int, limit: int=None) -> list[Data]:
+        """Gets a list of phrases that are due today (i.e. date <= now())"""
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError
+        return self._execQueryGetResults(
+            ChineseDB.SQL_GET_PHRASES_DUE_TODAY,
+            _buildChineseDataWithStats,
+            ChineseDB.bands[level],
+            maxOrdinalID,
+            self._getToday(),
+            -1 if limit is None else limit # Negative means no limit
+        )
+
+    def getPhraseIdsDueToday(self, level: HSK_LEVEL, maxOrdinalID: int, limit: int=None) -> list[int]:
+        """Same as getPhrasesDueToday() but only fetches the IDs"""
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError
+        return self._execQueryGetResults(
+            ChineseDB.SQL_GET_PHRASE_IDS_DUE_TODAY,
+            _buildFirstValue,
+            ChineseDB.bands[level],
+            maxOrdinalID,
+            self._getToday(),
+            -1 if limit is None else limit # Negative means no limit
+        )
+
+    def getRandomPhraseIdDueToday(self, level: HSK_LEVEL, maxOrdinalID: int, limit: int=None) -> int | None:
+        """
+        Returns the ID of a random one of the phrases getPhraseIdsDueToday()
+        would give, None if there are none
+        """
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError
+        # No row at all when nothing is due, rather than a row holding NULL
+        return next(self._execQueryIterResults(
+            ChineseDB.SQL_GET_RANDOM_PHRASE_ID_DUE_TODAY,
+            _buildFirstValue,
+            ChineseDB.bands[level],
+            maxOrdinalID,
+            self._getToday(),
+            -1 if limit is None else limit # Negative means no limit
+        ), None)
+
+    def getPhrasesDueTodayCount(self, level: LEARNING_LEVEL, maxOrdinalID: int) -> int:
+        """Returns the number of phrases due today"""
+        return int(self._execQueryGetResult(
+            ChineseDB.SQL_GET_PHRASES_DUE_TODAY_COUNT,
+            ChineseDB.bands[level],
+            maxOrdinalID,
+            self._getToday()
+        ))
+
+    def getPhrasesWithSameLogographs(self, simplified: str, originalID: int) -> list[ChineseDataWithStats]:
+        """
+        Returns a list of phrases that have the same string of Chinese characters,
+        but exclude the original
+        Ex. 吧 has 3 phrases: ba5, ba1, bia1, perhaps with ID's 0, 1, and 2 resp.
+        getPhrasesWithSameLogographs(吧, 0) returns [(1, 吧 data...), (2, 吧 data...)]
+        """
+        return self._execQueryGetResults(
+            ChineseDB.SQL_GET_PHRASES_WITH_SAME_LOGOGRAPHS,
+            _buildChineseDataWithStats,
+            simplified,
+            originalID
+        )
+
+    def getPhrasesWithSamePinyin(self, pinyinNormalized: str, originalID: int) -> list[ChineseDataWithStats]:
+        """
+        Returns a list of phrases that have the same normalized pinyin but exclude the original
+        Ex. tā has 3 phrases: 它, 踏, 塌 perhaps with ID's 0, 1, and 2 resp.
+        getPhrasesWithSamePinyin(ta1, 0) returns [(1, 踏 data...), (2, 塌 data...)]
+        """
+        return list(self.iterPhrasesWithSamePinyin(pinyinNormalized, originalID))
+
+    def iterPhrasesWithSamePinyin(self, pinyinNormalized: str, originalID: int) -> Generator[ChineseDataWithStats, None, None]:
+        """Same as getPhrasesWithSamePinyin() but yields phrases as they are read"""
+        return self._execQueryIterResults(
+            ChineseDB.SQL_GET_PHRASES_WITH_SAME_PINYIN,
+            _buildChineseDataWithStats,
+            pinyinNormalized,
+            originalID
+        )
+
+    def _getResponseTimeStats(self) -> dict[str, object]:
+        """
+        Returns the response time count, average and variance, reading all
+        three in one query when they aren't cached already
+        """
+        stats = self._statsCache
+        if not stats:
+            _query = self._execQuery(ChineseDB.SQL_GET_RESPONSE_TIME_STATS)[1]
+            _query.next()
+            stats["count"] = int(_query.value(0))
+            stats["average"] = float(_query.value(1))
+            stats["variance"] = float(_query.value(2))
+            _query.finish()
+        return stats
+
+    def _updateResponseTimeStats(self, responseTime: float) -> None:
+        """
+        Folds a newly logged response time into the cached statistics, if
+        cached, with the same Welford update SQL_UPDATE_RESPONSE_TIME_STATS
+        applies to the stored ones, saving a re-read on the next getter call
+        """
+        stats = self._statsCache
+        if not stats:
+            return
+        n = stats["count"]
+        if n == 0:
+            stats["count"] = 1
+            stats["average"] = responseTime
+            stats["variance"] = 0.0
+            return
+        mean = stats["average"]
+        newMean = mean + (responseTime - mean) / (n + 1)
+        m2 = stats["variance"] * n + (responseTime - mean) * (responseTime - newMean)
+        stats["count"] = n + 1
+        stats["average"] = newMean
+        stats["variance"] = m2 / (n + 1)
+
+    def getResponseTimeAverage(self) -> float:
+        """Returns the average response time, NaN if there are none"""
+        return self._getResponseTimeStats()["average"]
+    
+    def getResponseTimeCount(self) -> int:
+        """Returns the number of response times"""
+        return self._getResponseTimeStats()["count"]
+
+    def getResponseTimeVariance(self) -> float:
+        """Returns the variance in response times, NaN if there are none"""
+        return self._getResponseTimeStats()["variance"]
 
     def initializeDB(self) -> bool:
         """Creates table schemas"""
-        query = QSqlQuery(self.con)
-        query.exec("DROP TABLE IF EXISTS chinesePhrases;")
-        result = query.exec(
+        self._clearCaches()
+        return self._execScript(
             """
+            DROP TABLE IF EXISTS chinesePhrases;
             CREATE TABLE chinesePhrases (
                 id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
                 band TEXT NOT NULL,
@@ -447,15 +771,11 @@ class ChineseDB(Database):
                 lastTimeCorrect TEXT DEFAULT NULL,
                 dueDate TEXT DEFAULT NULL,
                 easeFactor REAL DEFAULT 2.5,
-                deleted INTEGER DEFAULT 0
+                deleted INTEGER DEFAULT 0,
+                pinyinNormalized TEXT NOT NULL DEFAULT ""
             );
-            """
-        )
-        if result == False:
-            return result
-        query.exec("DROP TABLE IF EXISTS responseTimes;")
-        return query.exec(
-            """
+
+            DROP TABLE IF EXISTS responseTimes;
             CREATE TABLE responseTimes (
                 reponseID INTEGER PRIMARY KEY AUTOINCREMENT,
                 chinesePhraseID INTEGER,
@@ -463,66 +783,117 @@ class ChineseDB(Database):
                 responseTime REAL,
                 FOREIGN KEY(chinesePhraseID) REFERENCES chinesePhrases(id)
             );
+
+            DROP TABLE IF EXISTS stats;
             """
-        )
+        ) and self._createStats() and self._createIndexes()
+
+    def _getInsertPhraseQuery(self) -> QSqlQuery:
+        """Returns the prepared phrase insertion statement, preparing it on first use"""
+        return self._prepareQuery(ChineseDB.SQL_INSERT_PHRASE)
 
     def insertPhrase(self, level: HSK_LEVEL, ordinalID: int, data: ChineseData) -> bool:
         """Inserts into database a new phrase given phrase data"""
-        return self._execQueryNoResults(
-            query="""
-            INSERT OR IGNORE INTO chinesePhrases (
-                band,
-                ordinalID,
-                simplified,
-                traditional,
-                pinyin,
-                english,
-                classifier,
-                taiwanPinyin,
-                wordsWithSamePinyin
-            )
-            VALUES (
-                :_band,
-                :_ordinalID,
-                :_simplified,
-                :_traditional,
-                :_pinyin,
-                :_english,
-                :_classifier,
-                :_taiwanPinyin,
-                :_wordsWithSamePinyin
-            )
-            """,
-            _band=ChineseDB[level],
-            _ordinalID=ordinalID,
-            _simplified=data.simplified,
-            _traditional=data.traditional,
-            _pinyin=data.pinyin,
-            _english=data.english,
-            _classifier=data.classifier,
-            _taiwanPinyin=data.taiwanPinyin,
-            _wordsWithSamePinyin=data.wordsWithSamePinyin
+        return self._execPreparedQuery(
+            self._getInsertPhraseQuery(),
+            ChineseDB.bands[level],
+            ordinalID,
+            data.simplified,
+            data.traditional,
+            data.pinyin,
+            data.english,
+            data.classifier,
+            data.taiwanPinyin,
+            data.wordsWithSamePinyin,
+            normalizePinyin(data.pinyin)
         )
 
+    def insertPhrasesBatch(self, level: HSK_LEVEL, rows: list[tuple[int, ChineseData]]) -> bool:
+        """
+        Inserts many phrases of the same level, given as (ordinalID, data)
+        pairs, by binding one list per column and executing them as a batch
+        """
+        if len(rows) == 0:
+            return True
+        began = self.begin() # False if already within a transaction
+        query = self._getInsertPhraseQuery()
+        ordinalIDs, phrases = zip(*rows)
+        query.addBindValue([ChineseDB.bands[level]] * len(rows))
+        query.addBindValue(list(ordinalIDs))
+        query.addBindValue([p.simplified for p in phrases])
+        query.addBindValue([p.traditional for p in phrases])
+        query.addBindValue([p.pinyin for p in phrases])
+        query.addBindValue([p.english for p in phrases])
+        query.addBindValue([p.classifier for p in phrases])
+        query.addBindValue([p.taiwanPinyin for p in phrases])
+        query.addBindValue([p.wordsWithSamePinyin for p in phrases])
+        query.addBindValue([normalizePinyin(p.pinyin) for p in phrases])
+        result = query.execBatch()
+        if began:
+            if result:
+                self.commit()
+            else:
+                self.rollback()
+        return result
+
     def insertResponseTime(self, id: int, timeStamp: datetime.datetime, responseTime: float) -> bool:
-        """Logs how long one took to answer a flashcard"""
-        return self._execQueryNoResults(
-            query="""
-            INSERT OR IGNORE INTO responseTimes (
-                chinesePhraseID,
-                timeStamp,
-                responseTime
-            )
-            VALUES (
-                :_id,
-                :_timeStamp,
-                :_responseTime
-            )
-            """,
-            _id=id,
-            _timeStamp=ChineseDB.formatTimeToStr(timeStamp),
-            _responseTime=responseTime
+        """Logs how long one took to answer a flashcard and updates the running statistics"""
+        began = self.begin() # False if already within a transaction
+        result = self._execPreparedQuery(
+            self._prepareQuery(ChineseDB.SQL_INSERT_RESPONSE_TIME),
+            id,
+            ChineseDB.formatTimeToStr(timeStamp),
+            responseTime
+        ) and self._execPreparedQuery(
+            self._prepareQuery(ChineseDB.SQL_UPDATE_RESPONSE_TIME_STATS),
+            responseTime
         )
+        if began:
+            if result:
+                result = self.commit()
+            else:
+                self.rollback()
+        if result:
+            self._updateResponseTimeStats(responseTime)
+        else: # Unsure what made it into the database, so reread next time
+            self._statsCache.clear()
+        return result
+
+    def insertResponseTimesBatch(self, rows: list[tuple[int, datetime.datetime, float]]) -> bool:
+        """
+        Logs many (id, timeStamp, responseTime) response times, updating the
+        running statistics for each, and commits them all at once
+        """
+        insertQuery = self._prepareQuery(ChineseDB.SQL_INSERT_RESPONSE_TIME)
+        updateStatsQuery = self._prepareQuery(ChineseDB.SQL_UPDATE_RESPONSE_TIME_STATS)
+        began = self.begin() # False if already within a transaction
+        # Looked up once here rather than on every row
+        formatTimeToStr = ChineseDB.formatTimeToStr
+        bindInsert, execInsert = insertQuery.addBindValue, insertQuery.exec
+        bindUpdateStats, execUpdateStats = updateStatsQuery.addBindValue, updateStatsQuery.exec
+        result = True
+        for id, timeStamp, responseTime in rows:
+            bindInsert(id)
+            bindInsert(formatTimeToStr(timeStamp))
+            bindInsert(responseTime)
+            result = execInsert()
+            if not result:
+                break
+            bindUpdateStats(responseTime)
+            result = execUpdateStats()
+            if not result:
+                break
+        if began:
+            if result:
+                result = self.commit()
+            else:
+                self.rollback()
+        if result:
+            for _, _, responseTime in rows:
+                self._updateResponseTimeStats(responseTime)
+        else: # Unsure what made it into the database, so reread next time
+            self._statsCache.clear()
+        return result
 
     def updatePhrase(
             self, 
@@ -530,33 +901,52 @@ class ChineseDB(Database):
             wasCorrect: bool,  
             dueDate: datetime.datetime, 
             easeFactor: float,
-            lastTimeCorrect: datetime.datetime=None
+            lastTimeCorrect: datetime.datetime=None,
+            lastTimeSeen: datetime.datetime=None
         ) -> bool:
-        """Updates entry with the user's results (were they correct in answering or not)"""
+        """
+        Updates entry with the user's results (were they correct in answering
+        or not). lastTimeSeen defaults to lastTimeCorrect when not given
+        """
 
+        self._phraseCache.pop(id, None)
+        if lastTimeSeen is None:
+            lastTimeSeen = lastTimeCorrect
+        if lastTimeSeen is not None:
+            lastTimeSeen = ChineseDB.formatTimeToStr(lastTimeSeen)
         if lastTimeCorrect is not None:
             lastTimeCorrect = ChineseDB.formatTimeToStr(lastTimeCorrect)
         dueDate = ChineseDB.formatTimeToStr(dueDate)
-        return self._execQueryNoResults(
-            query=f"""
-            UPDATE chinesePhrases
-            SET
-                timesCorrect = timesCorrect + :_correct,
-                lastTimeSeen = :_lastTimeSeen,
-                {"lastTimeCorrect = :_lastTimeCorrect," if lastTimeCorrect is not None else ""}
-                lastTimeCorrect = :_lastTimeCorrect,
-                dueDate = :_dueDate,
-                easeFactor = :_easeFactor
-            WHERE id = :_id;
-            """,
-            _id=id,
-            _correct=int(wasCorrect),
-            _lastTimeSeen=lastTimeCorrect,
-            _lastTimeCorrect=lastTimeCorrect,
-            _dueDate=dueDate,
-            _easeFactor=easeFactor
+        return self._execPreparedQuery(
+            self._prepareQuery(ChineseDB.SQL_UPDATE_PHRASE),
+            int(wasCorrect),
+            lastTimeSeen,
+            lastTimeCorrect,
+            dueDate,
+            easeFactor,
+            id
         )
 
+def _parseLevel(vocabFile: str, dataFile: str) -> list[tuple[int, ChineseData]]:
+    """
+    Reads one level's vocabulary list and phrase data, returning the phrases
+    as (ordinalID, data) pairs ready for ChineseDB.insertPhrasesBatch()
+    """
+    with open(dataFile, encoding="utf8", newline="") as dataHandle:
+        # Fields hold raw HTML full of quotes, so no CSV quoting
+        dataReader = csv.reader(dataHandle, delimiter='\t', quoting=csv.QUOTE_NONE)
+        next(dataReader) # Skip header
+        # A phrase may have several rows (one per pronunciation)
+        phrasesBySimplified = defaultdict(list)
+        for data in map(ChineseData.fromFields, dataReader):
+            phrasesBySimplified[data.simplified].append(data)
+    rows = []
+    with open(vocabFile, encoding="utf8") as vocabHandle:
+        for ordinalID, vocab in enumerate(vocabHandle):
+            # pop() so a repeated vocab line can't insert a phrase twice
+            rows.extend((ordinalID, data) for data in phrasesBySimplified.pop(vocab.rstrip(), ()))
+    return rows
+
 def main(args: list[str]) -> None:
     if len(args) <= 3:
         sys.stderr.write("Error: invalid number of inputs\n")
@@ -570,21 +960,19 @@ def main(args: list[str]) -> None:
     with ChineseDB(dbFile) as db:
         if not db.initializeDB(): # Failed to initialize
             raise
-        for vocabFile, dataFile, level in zip(vocabFiles, dataFiles, HSK_LEVEL):
-            vocabHandle = open(vocabFile, encoding="utf8")
-            dataHandle = open(dataFile, encoding="utf8")
-            dataHandle.readline() # Skip header
-            data = ChineseData.fromDelimitedString(dataHandle.readline(), '\t')
-            for ordinalID, vocab in enumerate(vocabHandle.readlines()):
-                vocab = vocab.rstrip()
-                while vocab == data.simplified:
-                    if not db.insertPhrase(level, ordinalID, data): # Failed to insert
+        db.begin()
+        try:
+            # Levels are independent so parse them in parallel, but leave the
+            # inserts to this process as SQLite only allows one writer
+            with ProcessPoolExecutor() as executor:
+                parsedLevels = executor.map(_parseLevel, vocabFiles, dataFiles)
+                for level, rows in zip(HSK_LEVELS, parsedLevels):
+                    if not db.insertPhrasesBatch(level, rows): # Failed to insert
                         raise
-                    if (l := dataHandle.readline()) == "": # EOF
-                        break
-                    data = ChineseData.fromDelimitedString(l, '\t')
-            vocabHandle.close()
-            dataHandle.close()
+        except:
+            db.rollback()
+            raise
+        db.commit()
     sys.exit(0)
 
 if __name__ == "__main__":
@@ -1,29 +1,72 @@
 # Base classes for interacting with databases
 
-from collections.abc import Callable
-from contextlib import AbstractContextManager
+from collections.abc import Callable, Generator
+from contextlib import AbstractContextManager, contextmanager
 import datetime
 import errno
+import functools
 from pathlib import Path
+import time
 from typing import Self
 
-import parse
 from PySide6.QtSql import QSqlDatabase, QSqlError, QSqlQuery
 
 from baseClasses import LEARNING_LEVEL
 
+# Exception to raise, given the database file, for each reason open() can fail
+_OPEN_ERRORS: dict[QSqlError.ErrorType, Callable[[str], Exception]] = {
+    QSqlError.ErrorType.ConnectionError:
+        lambda db: ConnectionRefusedError(errno.ECONNREFUSED, "Connection refused for file", db),
+    QSqlError.ErrorType.StatementError: # Should be impossible
+        lambda db: RuntimeError("Unable to open database due to a statement error"),
+    QSqlError.ErrorType.TransactionError: # Should be impossible
+        lambda db: RuntimeError("Unable to open database due to a transaction error"),
+    QSqlError.ErrorType.UnknownError:
+        lambda db: RuntimeError("Unable to open database for unknown reason")
+}
+
 class Data:
     """Base class for data stored in database"""
+    __slots__ = ()
+
     def __init__(self) -> None:
         pass
 
 class Database(AbstractContextManager):
     """Base class for all language databases"""
 
-    def __init__(self, dbName: str) -> None:
+    # Only one user ever writes to the file, so trade the strictest
+    # durability guarantees for far fewer fsyncs and a bigger page cache
+    PRAGMAS = """
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA cache_size = -64000;
+        PRAGMA mmap_size = 268435456;
+        """
+
+    # Most recently looked up phrases kept in memory by getPhraseById()
+    PHRASE_CACHE_SIZE = 512
+    # Seconds the formatted date from _getToday() is reused for
+    TODAY_TTL = 60
+
+    def __init__(self, dbName: str, connectionName: str=None, cacheSize: int=PHRASE_CACHE_SIZE) -> None:
         self.db = dbName
-        self.con = QSqlDatabase.addDatabase("QSQLITE")
-        self.con.setDatabaseName(self.db)
+        # Reuse the connection for this file if one was already registered,
+        # rather than re-adding (and clobbering) Qt's default connection
+        name = connectionName or f"pinyin::{dbName}"
+        if QSqlDatabase.contains(name):
+            self.con = QSqlDatabase.database(name, False)
+        else:
+            self.con = QSqlDatabase.addDatabase("QSQLITE", name)
+            self.con.setDatabaseName(self.db)
+        self._preparedQueries: dict[str, QSqlQuery] = {}
+        # Read caches, invalidated by whichever writes would make them stale
+        self._phraseCacheSize = max(cacheSize, 1)
+        self._phraseCache: dict[int, Data] = {}
+        self._statsCache: dict[str, object] = {}
+        self._today: str = None
+        self._todayExpiry = 0.0
 
     def __enter__(self) -> Self:
         self.open()
@@ -33,28 +76,76 @@ class Database(AbstractContextManager):
         self.close()
         return super().__exit__(exc_type, exc_value, traceback)
 
-    def _execQuery(self, /, query: str, **kwargs: str) -> tuple[bool, QSqlQuery]:
-        """Executes query with given keyword arguments"""
-        _query = QSqlQuery(self.con)
-        _query.setForwardOnly(True)
-        r = _query.prepare(query)
-        for key, value in kwargs.items():
-            _query.bindValue(f":{key}", value)
-        result = _query.exec()
+    def _prepareQuery(self, /, query: str) -> QSqlQuery:
+        """
+        Returns a forward only query prepared from the given SQL text, only
+        preparing it the first time that text is seen on this connection
+        """
+        _query = self._preparedQueries.get(query)
+        if _query is None:
+            _query = QSqlQuery(self.con)
+            _query.setForwardOnly(True)
+            _query.prepare(query)
+            self._preparedQueries[query] = _query
+        return _query
+
+    def _clearCaches(self) -> None:
+        """Forgets every cached phrase and statistic"""
+        self._phraseCache.clear()
+        self._statsCache.clear()
+
+    def _getToday(self) -> str:
+        """Returns today's local date as YYYY-MM-DD, reformatted at most every TODAY_TTL seconds"""
+        now = time.monotonic()
+        if now > self._todayExpiry:
+            self._today = datetime.date.today().isoformat()
+            self._todayExpiry = now + self.TODAY_TTL
+        return self._today
+
+    def _execPreparedQuery(self, /, _query: QSqlQuery, *args: object) -> bool:
+        """Binds given arguments, in order, to an already prepared query and executes it"""
+        addBindValue = _query.addBindValue
+        for value in args:
+            addBindValue(value)
+        return _query.exec()
+
+    def _execQuery(self, /, query: str, *args: object) -> tuple[bool, QSqlQuery]:
+        """Executes query with given positional ('?') arguments"""
+        _query = self._prepareQuery(query)
+        if _query.isActive():
+            # Still being iterated over elsewhere, so re-executing the cached
+            # query would pull its rows out from under that caller
+            _query = QSqlQuery(self.con)
+            _query.setForwardOnly(True)
+            _query.prepare(query)
+        result = self._execPreparedQuery(_query, *args)
         return (result, _query)
 
-    def _execQueryNoResults(self, /, query: str, **kwargs: str) -> bool:
-        """Executes query with given keyword arguments, returns success/fail"""
-        return self._execQuery(query, **kwargs)[0]
+    def _execScript(self, /, script: str) -> bool:
+        """
+        Executes several ';' separated statements on one query, as Qt only
+        runs the first statement given to exec(). Stops at the first failure
+        """
+        _query = QSqlQuery(self.con)
+        for statement in script.split(';'):
+            if statement.strip() and not _query.exec(statement):
+                return False
+        return True
+
+    def _execQueryNoResults(self, /, query: str, *args: object) -> bool:
+        """Executes query with given arguments, returns success/fail"""
+        result, _query = self._execQuery(query, *args)
+        _query.finish()
+        return result
 
     def _execQueryGetResult(
             self,
             /,
             query: str,
-            **kwargs: str
+            *args: object
         ) -> object:
-        """Executes query with given keyword arguments and returns the single value stored"""
-        _query = self._execQuery(query, **kwargs)[1]
+        """Executes query with given arguments and returns the single value stored"""
+        _query = self._execQuery(query, *args)[1]
         _query.next()
         result = _query.value(0)
         _query.finish()
@@ -65,34 +156,88 @@ class Database(AbstractContextManager):
             /,
             query: str,
             constructor: Callable[[QSqlQuery], object],
-            **kwargs: str
+            *args: object
         ) -> list[object]:
-        """Executes query with given keyword arguments and packages data via a constructor"""
-        _query = self._execQuery(query, **kwargs)[1]
-        results = []
-        while _query.next():
-            results.append(constructor(_query))
-        _query.finish()
-        return results
+        """Executes query with given arguments and packages data via a constructor"""
+        return list(self._execQueryIterResults(query, constructor, *args))
+
+    def _execQueryIterResults(
+            self,
+            /,
+            query: str,
+            constructor: Callable[[QSqlQuery], object],
+            *args: object
+        ) -> Generator[object, None, None]:
+        """
+        Executes query with given arguments and yields data packaged via a
+        constructor one row at a time
+        """
+        _query = self._execQuery(query, *args)[1]
+        _next = _query.next
+        try:
+            while _next():
+                yield constructor(_query)
+        finally:
+            _query.finish()
     
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def formatTimeToStr(time: datetime.datetime) -> str:
         """Converts to YYYY-MM-DD HH:MM:SS"""
-        year = f"{time.year:04}"
-        month = f"{time.month:02}"
-        day = f"{time.day:02}"
-        hour = f"{time.hour:02}"
-        minute = f"{time.minute:02}"
-        second = f"{time.second:02}"
-        return f"{year}-{month}-{day} {hour}:{minute}:{second}"
+        return time.strftime("%Y-%m-%d %H:%M:%S")
 
     @staticmethod
     def formatTimeToDateTime(time: str) -> datetime.datetime:
         """Converts from YYYY-MM-DD HH:MM:SS to datetime object"""
-        return parse.parse("{:%Y-%m-%d %H:%M:%S}", time)[0]
+        # Fixed width format, so slicing beats any general purpose parser
+        return datetime.datetime(
+            int(time[0:4]),
+            int(time[5:7]),
+            int(time[8:10]),
+            int(time[11:13]),
+            int(time[14:16]),
+            int(time[17:19])
+        )
     
+    def begin(self) -> bool:
+        """Starts a transaction. Returns True if successful, False otherwise"""
+        return self.con.transaction()
+
+    def commit(self) -> bool:
+        """Commits the current transaction. Returns True if successful, False otherwise"""
+        return self.con.commit()
+
+    def rollback(self) -> bool:
+        """
+        Rolls back the current transaction. Returns True if successful, False
+        otherwise. Cached reads may hold what was rolled back, so they're forgotten
+        """
+        self._clearCaches()
+        return self.con.rollback()
+
+    @contextmanager
+    def transaction(self) -> Generator[bool, None, None]:
+        """
+        Runs the enclosed statements as one transaction, committed when the
+        block ends and rolled back if it raises. Yields False when joining a
+        transaction already under way, which is then left for its owner
+        """
+        began = self.begin()
+        try:
+            yield began
+        except BaseException:
+            if began:
+                self.rollback()
+            raise
+        if began:
+            self.commit()
+
     def close(self) -> None:
-        """Close database connection"""
+        """Releases prepared queries then closes database connection"""
+        for _query in self._preparedQueries.values():
+            _query.finish()
+        self._preparedQueries.clear()
+        self._clearCaches()
         if self.con.isOpen():
             self.con.close()
 
@@ -104,20 +249,16 @@ class Database(AbstractContextManager):
             raise FileNotFoundError(errno.ENOENT, "Unable to find given file", self.db)
         result = self.con.open()
         if not result:
-            match self.con.lastError().type():
-                case QSqlError.ErrorType.NoError:
-                    pass
-                case QSqlError.ErrorType.ConnectionError:
-                    raise ConnectionRefusedError(errno.ECONNREFUSED, "Connection refused for file", self.db)
-                case QSqlError.ErrorType.StatementError: # Should be impossible
-                    raise RuntimeError("Unable to open database due to a statement error")
-                case QSqlError.ErrorType.TransactionError: # Should be impossible
-                    raise RuntimeError("Unable to open database due to a transaction error")
-                case QSqlError.ErrorType.UnknownError:
-                    raise RuntimeError("Unable to open database for unknown reason")
-                case _:
-                    pass
+            createError = _OPEN_ERRORS.get(self.con.lastError().type())
+            if createError is not None:
+                raise createError(self.db)
+        else:
+            self._applyPragmas()
         return result
+
+    def _applyPragmas(self) -> bool:
+        """Tunes the freshly opened connection, see PRAGMAS"""
+        return self._execScript(self.PRAGMAS)
     
     def deletePhrase(self, id: int) -> bool:
         """Deletes given phrase via ID"""
@@ -127,6 +268,18 @@ class Database(AbstractContextManager):
         """Returns the datum associated with the given ID if exists"""
         raise NotImplementedError
 
+    def getPhraseIds(self, level: LEARNING_LEVEL, maxOrdinalID: int, limit: int=None) -> list[int]:
+        """Gets a list of phrase IDs given a particular level and an upper bound in that level"""
+        raise NotImplementedError
+
+    def getPhraseOrdinalIds(self, level: LEARNING_LEVEL) -> list[tuple[int, int]]:
+        """Gets every (ordinalID, id) pair in a level, sorted by ordinalID"""
+        raise NotImplementedError
+
+    def getPhraseIdsDueToday(self, level: LEARNING_LEVEL, maxOrdinalID: int, limit: int=None) -> list[int]:
+        """Gets a list of IDs of phrases that are due today (i.e. date <= now())"""
+        raise NotImplementedError
+
     def getPhrases(self, level: LEARNING_LEVEL, maxOrdinalID: int, limit: int=None) -> list[Data]:
         """Gets a list of phrase data given a particular level and an upper bound in that level"""
         raise NotImplementedError
@@ -139,6 +292,10 @@ class Database(AbstractContextManager):
         """Returns the number of phrases due today"""
         raise NotImplementedError
 
+    def getRandomPhraseIdDueToday(self, level: LEARNING_LEVEL, maxOrdinalID: int, limit: int=None) -> int | None:
+        """Returns the ID of a random phrase that is due today, None if there are none"""
+        raise NotImplementedError
+
     def getResponseTimeAverage(self) -> float:
         """Returns the average response time"""
         raise NotImplementedError
@@ -159,10 +316,18 @@ class Database(AbstractContextManager):
         """Inserts into database a new phrase given phrase data"""
         raise NotImplementedError
     
+    def insertPhrasesBatch(self, level: LEARNING_LEVEL, rows: list[tuple[int, Data]]) -> bool:
+        """Inserts many (ordinalID, data) phrases of a level as a single batch"""
+        raise NotImplementedError
+
     def insertResponseTime(self, id: int, timeStamp: datetime.datetime, responseTime: float) -> bool:
         """Logs how long one took to answer a flashcard"""
         raise NotImplementedError
 
+    def insertResponseTimesBatch(self, rows: list[tuple[int, datetime.datetime, float]]) -> bool:
+        """Logs many (id, timeStamp, responseTime) response times within one transaction"""
+        raise NotImplementedError
+
     def isOpen(self) -> bool:
         """Returns True if connection is open"""
         return self.con.isOpen()
@@ -173,7 +338,8 @@ class Database(AbstractContextManager):
             wasCorrect: bool,  
             dueDate: datetime.datetime, 
             easeFactor: float,
-            lastTimeCorrect: datetime.datetime=None
+            lastTimeCorrect: datetime.datetime=None,
+            lastTimeSeen: datetime.datetime=None
         ) -> bool:
         """Updates entry with the user's results (were they correct in answering or not)"""
         raise NotImplementedError
\ No newline at end of file
@@ -6,19 +6,21 @@
 # 你好 -> ni3hao3
 
 import configparser
-from collections.abc import Callable, Generator
+from collections.abc import Generator
 from contextlib import AbstractContextManager, contextmanager, redirect_stdout
+from bisect import bisect_right
 import datetime
 from enum import Enum
 import errno
+import functools
+from itertools import accumulate
 from pathlib import Path
 import random
 import sys
-from typing import Self
+from typing import NamedTuple, Self
 
-from bs4 import BeautifulSoup
 import darkdetect
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import QCommandLineParser, QEvent, Qt, QTimer
 from PySide6.QtGui import QFont
 from PySide6.QtWidgets import (
     QApplication,
@@ -36,11 +38,22 @@ from PySide6.QtWidgets import (
 )
 
 from baseClasses import LABEL_SIDE, LEARNING_LEVEL, ANSWER_STATE, QUALITY
-from chineseClasses import HSK_LEVEL
+from chineseClasses import HSK_LEVEL, HSK_LEVELS
 from chineseDatabase import ChineseDB, ChineseDataWithStats
 
 WINDOW_WIDTH = 600
 WINDOW_HEIGHT = 600
+# Indexed by HSK_LEVEL value
+CHECKBOX_LABELS = (
+    "HSK Band 1",
+    "HSK Band 2",
+    "HSK Band 3",
+    "HSK Band 4",
+    "HSK Band 5",
+    "HSK Band 6",
+    "HSK Bands 7-9"
+)
+SLIDER_UPDATE_DELAY = 30 # ms between slider label updates while dragging
 
 def createErrorMessage(parent: QWidget, message: str, title: str="Error") -> None:
     """Creates an error message box window"""
@@ -67,20 +80,39 @@ class View(QMainWindow):
         BLUE    = "#FF0000FF"
         PURPLE  = "#FF800080"
 
-    checkboxLabels = {
-        HSK_LEVEL.HSK_1: "HSK Band 1",
-        HSK_LEVEL.HSK_2: "HSK Band 2",
-        HSK_LEVEL.HSK_3: "HSK Band 3",
-        HSK_LEVEL.HSK_4: "HSK Band 4",
-        HSK_LEVEL.HSK_5: "HSK Band 5",
-        HSK_LEVEL.HSK_6: "HSK Band 6",
-        HSK_LEVEL.HSK_7_9: "HSK Bands 7-9"
+    class LevelRow(NamedTuple):
+        """One level's widgets in the setup view's grid"""
+        checkbox: QCheckBox
+        labelStart: QLabel
+        slider: QSlider
+        labelEnd: QLabel
+
+    ALIGN_TOP_CENTER = Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter
+
+    # Built once so recolouring a label doesn't format a new stylesheet each time
+    STYLESHEETS = {color: f"color: {color.value}" for color in COLOR}
+
+    # Stars and colour shown for each quality of answer
+    QUALITY_DISPLAY = {
+        QUALITY.FIVE:   ("******",  COLOR.PURPLE),
+        QUALITY.FOUR:   ("*****",   COLOR.BLUE),
+        QUALITY.THREE:  ("****",    COLOR.GREEN),
+        QUALITY.TWO:    ("***",     COLOR.YELLOW),
+        QUALITY.ONE:    ("**",      COLOR.ORANGE),
+        QUALITY.ZERO:   ("*",       COLOR.RED)
     }
 
     def __init__(self, windowWidth: int, windowHeight: int) -> None:
         super().__init__()
         self.state: View.STATE = View.STATE.NULL
         self.quality: QUALITY = None
+        # Last colour given to each label, see _setColor()
+        self.labelColors: dict[QLabel, View.COLOR] = {}
+        # Last text given to each setup view label, see setLabel()
+        self.labelTexts: dict[QLabel, str] = {}
+        # Colour of unhidden text, asked of the OS at startup and on theme changes only
+        self.textColor: View.COLOR = None
+        self._updateTextColor()
 
         self.setWindowTitle("Pinyin Tester")
         self.setFixedSize(windowWidth, windowHeight)
@@ -89,34 +121,48 @@ class View(QMainWindow):
         self._createSetupView(windowWidth, windowHeight)
         self._createTestingView(windowWidth, windowHeight)
 
+        # Placeholder until the controller loads the setup view
+        labelLoading = QLabel("Loading...")
+        labelLoading.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setCentralWidget(labelLoading)
+
     def _createSetupView(self, windowWidth: int, windowHeight: int) -> None:
         """Creates all the widgets used in the setup view"""
         self.setupView = QWidget(self)
         self.setupLayout = QVBoxLayout()
         self.gridLayout = QGridLayout()
-        self.checkboxes:    dict[HSK_LEVEL, QCheckBox]      = {}
-        self.labelsStart:   dict[HSK_LEVEL, QLabel]         = {}
-        self.sliders:       dict[HSK_LEVEL, QSlider]        = {}
-        self.labelsEnd:     dict[HSK_LEVEL, QLabel]         = {}
-        for row, level in enumerate(HSK_LEVEL):
-            self.checkboxes[level] = QCheckBox(View.checkboxLabels[level])
-            self.gridLayout.addWidget(self.checkboxes[level], row, 0)
-            self.labelsStart[level] = QLabel()
-            self.labelsStart[level].setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.labelsStart[level].setMinimumWidth(60)
-            self.gridLayout.addWidget(self.labelsStart[level], row, 1)
-            self.sliders[level] = QSlider(Qt.Orientation.Horizontal)
-            self.sliders[level].setMinimum(1)
-            self.gridLayout.addWidget(self.sliders[level], row, 2)
-            self.labelsEnd[level] = QLabel()
-            self.labelsEnd[level].setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.labelsEnd[level].setMinimumWidth(60)
-            self.gridLayout.addWidget(self.labelsEnd[level], row, 3)
+        # Indexed by HSK_LEVEL value
+        self.rows: list[View.LevelRow] = []
+        # Hold off repainting until the whole grid is filled in
+        self.setupView.setUpdatesEnabled(False)
+        addWidget = self.gridLayout.addWidget
+        alignCenter = Qt.AlignmentFlag.AlignCenter
+        for row, level in enumerate(HSK_LEVELS):
+            checkbox = QCheckBox(CHECKBOX_LABELS[level.value])
+            labelStart = QLabel()
+            labelStart.setAlignment(alignCenter)
+            labelStart.setMinimumWidth(60)
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setMinimum(1)
+            labelEnd = QLabel()
+            labelEnd.setAlignment(alignCenter)
+            labelEnd.setMinimumWidth(60)
+            addWidget(checkbox, row, 0)
+            addWidget(labelStart, row, 1)
+            addWidget(slider, row, 2)
+            addWidget(labelEnd, row, 3)
+            self.rows.append(View.LevelRow(checkbox, labelStart, slider, labelEnd))
         self.setupLayout.addLayout(self.gridLayout)
         self.buttonBegin = QPushButton("Begin")
         self.buttonBegin.setMaximumWidth(100)
         self.setupLayout.addWidget(self.buttonBegin, alignment=Qt.AlignmentFlag.AlignHCenter)
         self.setupView.setLayout(self.setupLayout)
+        self.setupView.setUpdatesEnabled(True)
+        # Position of each side's label within a LevelRow
+        self.labelIndexBySide: dict[LABEL_SIDE, int] = {
+            LABEL_SIDE.START: View.LevelRow._fields.index("labelStart"),
+            LABEL_SIDE.END: View.LevelRow._fields.index("labelEnd")
+        }
 
     def _createTestingView(self, windowWidth: int, windowHeight: int) -> None:
         """Creates all the widgets used in the testing view"""
@@ -135,27 +181,27 @@ class View(QMainWindow):
         self.testingLayout.addLayout(self.layoutHeader)
         self.labelQuality = QLabel()
         self.labelQuality.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        self.labelQuality.setFont(QFont("Arial", 10))
+        self.labelQuality.setFont(View._font("Arial", 10))
         self.testingLayout.addWidget(self.labelQuality)
         self.labelChinese = QLabel()
         self.labelChinese.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        self.labelChinese.setFont(QFont("SimSun", 60))
+        self.labelChinese.setFont(View._font("SimSun", 60))
         self.labelChinese.setWordWrap(True)
         self.testingLayout.addWidget(self.labelChinese)
         self.labelPinyin = QLabel()
         self.labelPinyin.setMargin(int(windowHeight * 0.01))
         self.labelPinyin.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        self.labelPinyin.setFont(QFont("Arial", 40))
+        self.labelPinyin.setFont(View._font("Arial", 40))
         self.testingLayout.addWidget(self.labelPinyin)
         self.labelDetails = QLabel()
         self.labelDetails.setMinimumHeight(int(windowHeight * 0.6))
-        self.labelDetails.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
-        self.labelDetails.setFont(QFont("Arial", 18))
+        self.labelDetails.setAlignment(View.ALIGN_TOP_CENTER)
+        self.labelDetails.setFont(View._font("Arial", 18))
         self.labelDetails.setWordWrap(True)
         self.testingLayout.addWidget(self.labelDetails)
         self.lineEditPinyin = QLineEdit()
         self.lineEditPinyin.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lineEditPinyin.setFont(QFont("Arial", 40))
+        self.lineEditPinyin.setFont(View._font("Arial", 40))
         self.testingLayout.addWidget(self.lineEditPinyin)
         self.testingButtonLayout = QHBoxLayout()
         self.buttonBack = QPushButton("Back")
@@ -167,6 +213,47 @@ class View(QMainWindow):
         self.testingLayout.addWidget(self.buttonCheck)
         self.testingView.setLayout(self.testingLayout)
 
+    @staticmethod
+    @functools.lru_cache
+    def _font(family: str, pointSize: int) -> QFont:
+        """
+        Returns a shared font, only built on first use as Qt needs the
+        QApplication to exist by then
+        """
+        return QFont(family, pointSize)
+
+    def _setColor(self, label: QLabel, color: COLOR) -> None:
+        """Sets a label's text colour, skipping Qt's restyle if it already has it"""
+        if self.labelColors.get(label) is not color:
+            self.labelColors[label] = color
+            label.setStyleSheet(View.STYLESHEETS[color])
+
+    def _updateTextColor(self) -> None:
+        """Picks the colour of unhidden text to suit the system's light or dark theme"""
+        self.textColor = View.COLOR.BLACK if darkdetect.isLight() else View.COLOR.WHITE
+
+    @contextmanager
+    def batchSetupUpdates(self) -> Generator:
+        """
+        Repaints the setup view only once, after the block, and holds back the
+        signals of its checkboxes and sliders while they're changed
+        """
+        self.setupView.setUpdatesEnabled(False)
+        widgets = [widget for row in self.rows for widget in (row.checkbox, row.slider)]
+        wereBlocked = [widget.blockSignals(True) for widget in widgets]
+        try:
+            yield
+        finally:
+            for widget, wasBlocked in zip(widgets, wereBlocked):
+                widget.blockSignals(wasBlocked)
+            self.setupView.setUpdatesEnabled(True)
+
+    def changeEvent(self, event: QEvent) -> None:
+        """Rechecks the system theme when Qt reports the palette changed"""
+        if event.type() == QEvent.Type.PaletteChange:
+            self._updateTextColor()
+        super().changeEvent(event)
+
     def clearInput(self) -> None:
         """Sets textbox to blank"""
         self.labelPinyin.setText("")
@@ -182,7 +269,7 @@ class View(QMainWindow):
     def getCheckBoxState(self, level: LEARNING_LEVEL) -> bool | None:
         """Returns whether a given box is checked or not"""
         try:
-            return self.checkboxes[level].isChecked()
+            return self.rows[level.value].checkbox.isChecked()
         except:
             return None
 
@@ -193,49 +280,40 @@ class View(QMainWindow):
     def getSliderMaximum(self, level: LEARNING_LEVEL) -> int | None:
         """Returns the maximum value of the specified slider"""
         try:
-            return self.sliders[level].maximum()
+            return self.rows[level.value].slider.maximum()
         except:
             return None
 
     def getSliderPosition(self, level: LEARNING_LEVEL) -> int | None:
         """Returns what value the specified slider is at"""
         try:
-            return self.sliders[level].value()
+            return self.rows[level.value].slider.value()
         except:
             return None
 
     def loadNextQuestion(self, prompt: str, answer: str, details: str) -> None:
         """Fetches new question and sets up display"""
+        # Repaint once for the whole card rather than after every label
+        self.testingView.setUpdatesEnabled(False)
         self.labelChinese.setText(prompt)
         self.hideAnswer()
         self.labelPinyin.setText(answer)
         self.labelDetails.setText(details)
         self.lineEditPinyin.setText("")
+        self.testingView.setUpdatesEnabled(True)
         self.lineEditPinyin.setFocus()
     
     def loadSetupView(self) -> None:
-        match self.state:
-            case View.STATE.NULL: # No central widget yet
-                pass
-            case View.STATE.SETUP: # No point reloading view
-                pass
-            case View.STATE.TESTING:
-                self.testingView = self.takeCentralWidget()
-            case _:
-                pass
+        # Nothing to take back if there's no central widget yet or it's already this view
+        if self.state is View.STATE.TESTING:
+            self.testingView = self.takeCentralWidget()
         self.state = View.STATE.SETUP
         self.setCentralWidget(self.setupView)
 
     def loadTestingView(self) -> None:
-        match self.state:
-            case View.STATE.NULL: # No central widget yet
-                pass
-            case View.STATE.SETUP:
-                self.setupView = self.takeCentralWidget()
-            case View.STATE.TESTING: # No point reloading view
-                pass
-            case _:
-                pass
+        # Nothing to take back if there's no central widget yet or it's already this view
+        if self.state is View.STATE.SETUP:
+            self.setupView = self.takeCentralWidget()
         self.state = View.STATE.TESTING
         self.setCentralWidget(self.testingView)
         self.lineEditPinyin.setFocus()
@@ -246,22 +324,23 @@ class View(QMainWindow):
 
     def hideAnswer(self) -> None:
         """Hides answer and its details"""
-        self.labelPinyin.setStyleSheet(f"color: {View.COLOR.CLEAR.value}")
-        self.labelDetails.setStyleSheet(f"color: {View.COLOR.CLEAR.value}")
+        self._setColor(self.labelPinyin, View.COLOR.CLEAR)
+        self._setColor(self.labelDetails, View.COLOR.CLEAR)
 
     def setCheckBoxState(self, level: LEARNING_LEVEL, state: bool) -> None:
         """Sets particular check box to a given state"""
-        self.checkboxes[level].setChecked(state)
+        self.rows[level.value].checkbox.setChecked(state)
 
     def setLabel(self, labelSide: LABEL_SIDE, level: LEARNING_LEVEL, definition: str, index: int) -> None:
         """Sets particular label to 'definition\nindex'"""
-        match labelSide:
-            case LABEL_SIDE.START:
-                self.labelsStart[level].setText(f"{definition}\n{index}")
-            case LABEL_SIDE.END:
-                self.labelsEnd[level].setText(f"{definition}\n{index}")
-            case _:
-                pass
+        labelIndex = self.labelIndexBySide.get(labelSide)
+        if labelIndex is not None:
+            label = self.rows[level.value][labelIndex]
+            text = f"{definition}\n{index}"
+            # Skip Qt's relayout when a slider lands back on the value it showed
+            if self.labelTexts.get(label) != text:
+                self.labelTexts[label] = text
+                label.setText(text)
 
     def setQuality(self, quality: QUALITY) -> None:
         """Sets quality"""
@@ -269,92 +348,59 @@ class View(QMainWindow):
 
     def setAnswerCorrect(self) -> None:
         """If answer was correct, show it in green and unhide description"""
-        self.labelPinyin.setStyleSheet(f"color: {View.COLOR.GREEN.value}")
-        if darkdetect.isLight():
-            self.labelDetails.setStyleSheet(f"color: {View.COLOR.BLACK.value}")
-        else:
-            self.labelDetails.setStyleSheet(f"color: {View.COLOR.WHITE.value}")
+        self._setColor(self.labelPinyin, View.COLOR.GREEN)
+        self._setColor(self.labelDetails, self.textColor)
 
     def setAnswerWrong(self) -> None:
         """If answer was incorrect, show it in red and unhide description"""
-        self.labelPinyin.setStyleSheet(f"color: {View.COLOR.RED.value}")
-        if darkdetect.isLight():
-            self.labelDetails.setStyleSheet(f"color: {View.COLOR.BLACK.value}")
-        else:
-            self.labelDetails.setStyleSheet(f"color: {View.COLOR.WHITE.value}")
+        self._setColor(self.labelPinyin, View.COLOR.RED)
+        self._setColor(self.labelDetails, self.textColor)
 
     def setSliderMaximum(self, level: LEARNING_LEVEL, maximum: int) -> None:
         """Set particular slider's maximum"""
-        self.sliders[level].setMaximum(maximum)
+        self.rows[level.value].slider.setMaximum(maximum)
     
     def setSliderPosition(self, level: LEARNING_LEVEL, position: int) -> None:
         """Set particular slider's position"""
-        self.sliders[level].setSliderPosition(position)
+        self.rows[level.value].slider.setSliderPosition(position)
 
     def showQuality(self) -> None:
         """Shows the user what quality their answer was"""
-        if self.quality is None:
+        display = View.QUALITY_DISPLAY.get(self.quality)
+        if display is None:
             return
-        match self.quality:
-            case QUALITY.FIVE:
-                self.labelQuality.setText("******")
-                self.labelQuality.setStyleSheet(f"color: {View.COLOR.PURPLE.value}")
-            case QUALITY.FOUR:
-                self.labelQuality.setText("*****")
-                self.labelQuality.setStyleSheet(f"color: {View.COLOR.BLUE.value}")
-            case QUALITY.THREE:
-                self.labelQuality.setText("****")
-                self.labelQuality.setStyleSheet(f"color: {View.COLOR.GREEN.value}")
-            case QUALITY.TWO:
-                self.labelQuality.setText("***")
-                self.labelQuality.setStyleSheet(f"color: {View.COLOR.YELLOW.value}")
-            case QUALITY.ONE:
-                self.labelQuality.setText("**")
-                self.labelQuality.setStyleSheet(f"color: {View.COLOR.ORANGE.value}")
-            case QUALITY.ZERO:
-                self.labelQuality.setText("*")
-                self.labelQuality.setStyleSheet(f"color: {View.COLOR.RED.value}")
-            case _:
-                pass
+        stars, color = display
+        self.labelQuality.setText(stars)
+        self._setColor(self.labelQuality, color)
 
     def unhideAnswer(self) -> None:
         """Unhides answer and its details"""
-        if darkdetect.isLight():
-            self.labelPinyin.setStyleSheet(f"color: {View.COLOR.BLACK.value}")
-            self.labelDetails.setStyleSheet(f"color: {View.COLOR.BLACK.value}")
-        else:
-            self.labelPinyin.setStyleSheet(f"color: {View.COLOR.WHITE.value}")
-            self.labelDetails.setStyleSheet(f"color: {View.COLOR.WHITE.value}")
+        self._setColor(self.labelPinyin, self.textColor)
+        self._setColor(self.labelDetails, self.textColor)
 
 class Model(AbstractContextManager):
     """The brains"""
 
-    DIACRITIC_TO_TONE = {
-        'ā': 1, 'ē': 1, 'ī': 1, 'ō': 1, 'ū': 1, 'ǖ': 1,
-        'Ā': 1, 'Ē': 1, 'Ī': 1, 'Ō': 1, 'Ū': 1, 'Ǖ': 1,
-        'á': 2, 'é': 2, 'í': 2, 'ó': 2, 'ú': 2, 'ǘ': 2,
-        'Á': 2, 'É': 2, 'Í': 2, 'Ó': 2, 'Ú': 2, 'Ǘ': 2,
-        'ǎ': 3, 'ě': 3, 'ǐ': 3, 'ǒ': 3, 'ǔ': 3, 'ǚ': 3,
-        'Ǎ': 3, 'Ě': 3, 'Ǐ': 3, 'Ǒ': 3, 'Ǔ': 3, 'Ǚ': 3,
-        'à': 4, 'è': 4, 'ì': 4, 'ò': 4, 'ù': 4, 'ǜ': 4,
-        'À': 4, 'È': 4, 'Ì': 4, 'Ò': 4, 'Ù': 4, 'Ǜ': 4
-    }
-    TONE1_DIACRITICS_TO_VOWEL = {
-        'ā':'a','ē':'e','ī':'i','ō':'o','ū':'u','ǖ':'v',
-        'Ā':'A','Ē':'E','Ī':'I','Ō':'O','Ū':'U','Ǖ':'V'
-    }
-    TONE2_DIACRITICS_TO_VOWEL = {
-        'á':'a','é':'e','í':'i','ó':'o','ú':'u','ǘ':'v',
-        'Á':'A','É':'E','Í':'I','Ó':'O','Ú':'U','Ǘ':'V'
-    }
-    TONE3_DIACRITICS_TO_VOWEL = {
-        'ǎ':'a','ě':'e','ǐ':'i','ǒ':'o','ǔ':'u','ǚ':'v',
-        'Ǎ':'A','Ě':'E','Ǐ':'I','Ǒ':'O','Ǔ':'U','Ǚ':'V'
-    }
-    TONE4_DIACRITICS_TO_VOWEL = {
-        'à':'a','è':'e','ì':'i','ò':'o','ù':'u','ǜ':'v',
-        'À':'A','È':'E','Ì':'I','Ò':'O','Ù':'U','Ǜ':'V'
+    # Response times needed before answer speed affects quality
+    MIN_RESPONSE_TIMES = 100
+    # Folds typed and stored answers alike, after casefold(): drops spaces and
+    # accepts 'v' for 'ü', which stays in syllables like lüè (lüe4)
+    ANSWER_FOLDS = str.maketrans({" ": None, "\t": None, "ü": "v"})
+    # Deletes the tone numbers when tones are ignored
+    TONE_NUMBER_DELETIONS = str.maketrans("", "", "0123456789")
+    # Phrases whose homonyms are kept in memory by _intializePhraseVariables()
+    HOMONYMS_CACHE_SIZE = 512
+
+    # SM-2 change to a phrase's ease factor for each quality of answer
+    EASE_FACTOR_CHANGES = {
+        QUALITY.FIVE:   +0.10,
+        QUALITY.FOUR:   +0.00,
+        QUALITY.THREE:  -0.14,
+        QUALITY.TWO:    -0.32,
+        QUALITY.ONE:    -0.54,
+        QUALITY.ZERO:   -0.80
     }
+    MIN_EASE_FACTOR = 1.3
 
     def __init__(self, databaseFile: str, vocabularyFiles: list[str], /, newUnseenCardChance: float=0.3) -> None:
         """
@@ -367,7 +413,10 @@ class Model(AbstractContextManager):
             stave off boredom
         """
         self.chineseDB = ChineseDB(databaseFile)
-        self.vocabularies = self._getChineseVocabularies(vocabularyFiles)
+        # Every level's phrases back to back, with each level's [start, end) slice of them
+        self.vocabulary: list[str] = []
+        self.vocabularyRanges: dict[HSK_LEVEL, tuple[int, int]] = {}
+        self._getChineseVocabularies(vocabularyFiles)
         self.maximums = self._getMaximums()
         if newUnseenCardChance >= 1:
             raise ValueError(f"New unseen card chance must be between 0 and 1 (0 <= chance <= 1). Given: {newUnseenCardChance}")
@@ -375,9 +424,21 @@ class Model(AbstractContextManager):
 
         self.currentPhrase: ChineseDataWithStats = None
         self.phrasesWithSameLogographs: list[ChineseDataWithStats] = None
+        # Folded numbered pinyin of the current phrase and its homonyms, see ANSWER_FOLDS
+        self.currentAnswer: str = None
+        self.homonymAnswers: frozenset[str] = frozenset()
+        # The same answers with their tone numbers deleted, for when tones are ignored
+        self.homonymAnswersToneless: frozenset[str] = frozenset()
         self.previouslyAnsweredPhrases: list[ChineseDataWithStats] = []
         self.incorrectPhrasesData: dict[int, QUALITY] = {}
+        # Per level, the phrases' ordinalIDs and (parallel to them) their IDs
+        self.phraseIdsCache: dict[LEARNING_LEVEL, tuple[list[int], list[int]]] = {}
+        # Per recently seen phrase ID, its homonyms and their answers, least recently used first.
+        # Only the homonyms' pinyin is read, so their stats going stale doesn't matter
+        self.homonymsCache: dict[int, tuple[list[ChineseDataWithStats], frozenset[str], frozenset[str]]] = {}
         self.start: datetime.datetime = None
+        # When the current answer was submitted, read once per checkAnswer()
+        self.end: datetime.datetime = None
 
     def __enter__(self) -> Self:
         self.open()
@@ -390,14 +451,15 @@ class Model(AbstractContextManager):
     def _assessQuality(self, answerState: ANSWER_STATE) -> QUALITY:
         """Updates quality member based on timing and correctness of response"""
         # Figure out how much time the user took to answer
-        temp = datetime.datetime.now() - self.start
-        delta = float(temp.seconds) + (temp.microseconds / 1000000)
-        num = self.chineseDB.getResponseTimeCount()
+        delta = (self.end - self.start).total_seconds()
+        # Timings are only compared against the user's history once there's enough of it
+        hasEnoughData = self.chineseDB.getResponseTimeCount() >= Model.MIN_RESPONSE_TIMES
+        if hasEnoughData:
+            avg = self.chineseDB.getResponseTimeAverage()
+            std = self.chineseDB.getResponseTimeVariance() ** 0.5
         match answerState:
             case ANSWER_STATE.CORRECT:
-                if num >= 100:
-                    avg = self.chineseDB.getResponseTimeAverage()
-                    std = self.chineseDB.getResponseTimeVariance() ** 0.5
+                if hasEnoughData:
                     if delta <= (avg - std):
                         return QUALITY.FIVE
                     elif delta <= (avg + std / 2):
@@ -408,9 +470,7 @@ class Model(AbstractContextManager):
                     return QUALITY.FOUR
             case ANSWER_STATE.HOMONYM:
                 # Can't ever give a 5/5 rating
-                if num >= 100:
-                    avg = self.chineseDB.getResponseTimeAverage()
-                    std = self.chineseDB.getResponseTimeVariance() ** 0.5
+                if hasEnoughData:
                     if delta <= (avg - std):
                         return QUALITY.FOUR
                     else:
@@ -418,16 +478,16 @@ class Model(AbstractContextManager):
                 else: # Not enough empirical data
                     return QUALITY.THREE
             case ANSWER_STATE.WRONG:
-                numDifferentAnswers = len(
-                    self.chineseDB.getPhrasesWithSamePinyin(
-                        self.currentPhrase.pinyin, 
+                # Only need to know if there is at least one other answer
+                hasDifferentAnswers = next(
+                    self.chineseDB.iterPhrasesWithSamePinyin(
+                        self.currentPhrase.pinyinNormalized,
                         self.currentPhrase.id
-                    )
-                )
-                if numDifferentAnswers > 0:
-                    if num >= 100:
-                        avg = self.chineseDB.getResponseTimeAverage()
-                        std = self.chineseDB.getResponseTimeVariance() ** 0.5
+                    ),
+                    None
+                ) is not None
+                if hasDifferentAnswers:
+                    if hasEnoughData:
                         if delta <= (avg - std):
                             return QUALITY.TWO
                         else:
@@ -440,188 +500,140 @@ class Model(AbstractContextManager):
         # Dunno how it got here so just give a meh rating
         return QUALITY.TWO
 
-    def _getChineseVocabularies(self, chineseVocabularyFiles: list[str]) -> dict[HSK_LEVEL, list[str]]:
-        """Reads a list of files and harvests the first column"""
-        results = {}
-        for f, level in zip(chineseVocabularyFiles, HSK_LEVEL):
+    def _getChineseVocabularies(self, chineseVocabularyFiles: list[str]) -> None:
+        """Reads a list of files, one per level, and harvests the first column into vocabulary"""
+        for f, level in zip(chineseVocabularyFiles, HSK_LEVELS):
             if not Path(f).is_file():
                 raise FileNotFoundError(errno.ENOENT, "Unable to find given file", f)
-            result = []
+            start = len(self.vocabulary)
             with open(f, encoding="utf8") as handle:
-                for l in handle.readlines():
-                    # Get first column string, remove trailing '\n'
-                    result.append(l.split('\t', 1)[0][:-1])
-            results[level] = result
-        return results
+                # Get first column string, stripping the '\n' left on when there's no tab
+                self.vocabulary.extend(l.partition('\t')[0].rstrip('\n') for l in handle)
+            self.vocabularyRanges[level] = (start, len(self.vocabulary))
     
     def _getMaximums(self) -> dict[HSK_LEVEL, int]:
         """Returns a dict showing how much vocab in is each level"""
-        return {level: len(self.vocabularies[level]) for level in HSK_LEVEL}
+        return {level: end - start for level, (start, end) in self.vocabularyRanges.items()}
 
     def _intializePhraseVariables(self, phrase: ChineseDataWithStats) -> None:
         """Sets up member variables given new phrase"""
         self.currentPhrase = phrase
-        self.phrasesWithSameLogographs = self.chineseDB.getPhrasesWithSameLogographs(
-            self.currentPhrase.simplified,
-            self.currentPhrase.id)
+        cache = self.homonymsCache
+        # Popped and put back so the dict stays ordered least to most recently used
+        homonyms = cache.pop(phrase.id, None)
+        if homonyms is None:
+            phrases = self.chineseDB.getPhrasesWithSameLogographs(phrase.simplified, phrase.id)
+            # Normalised when the phrases were stored, so checking is plain comparison
+            answers = frozenset(p.pinyinNormalized.translate(Model.ANSWER_FOLDS) for p in phrases)
+            homonyms = (phrases, answers, frozenset(a.translate(Model.TONE_NUMBER_DELETIONS) for a in answers))
+            if len(cache) >= Model.HOMONYMS_CACHE_SIZE:
+                del cache[next(iter(cache))]
+        cache[phrase.id] = homonyms
+        self.phrasesWithSameLogographs, self.homonymAnswers, self.homonymAnswersToneless = homonyms
+        self.currentAnswer = phrase.pinyinNormalized.translate(Model.ANSWER_FOLDS)
         self.start = datetime.datetime.now()
 
     def _insertResponseTime(self, pauseTime: float=0) -> None:
         """Inserts response time to database"""
         self.chineseDB.insertResponseTime(
             self.currentPhrase.id,
-            timeStamp=datetime.datetime.now(),
+            timeStamp=self.end,
             responseTime=self.calculateResponseTime(pauseTime)
         )
 
     def _updatePhrase(self, answerState: ANSWER_STATE, quality: QUALITY) -> None:
         """Updates Chinese phrase data to database"""
+        easeFactor = Model.updateEaseFactor(self.currentPhrase.easeFactor, quality)
         self.chineseDB.updatePhrase(
             self.currentPhrase.id,
             wasCorrect=(answerState == ANSWER_STATE.CORRECT),
             dueDate=Model.updateDueDate(
                 self.currentPhrase.lastTimeSeen,
                 self.currentPhrase.dueDate,
-                self.currentPhrase.easeFactor,
-                quality
-            ),
-            easeFactor=Model.updateEaseFactor(
-                self.currentPhrase.easeFactor,
-                quality
+                easeFactor,
+                quality,
+                self.end
             ),
-            lastTimeCorrect=datetime.datetime.now()
+            easeFactor=easeFactor,
+            lastTimeCorrect=self.end
         )
     
-    def _updateDatabaseDuringFlush(self, id: int, quality: QUALITY) -> None:
+    def _updateDatabaseDuringFlush(self, id: int, quality: QUALITY, now: datetime.datetime) -> None:
         """Updates Chinese phrase data and inserts the response time. To be run only by flush()"""
         phrase = self.chineseDB.getPhraseById(id)
+        easeFactor = Model.updateEaseFactor(phrase.easeFactor, quality)
         self.chineseDB.updatePhrase(
             id,
             wasCorrect=False,
             dueDate=Model.updateDueDate(
                 phrase.lastTimeSeen,
                 phrase.dueDate,
-                phrase.easeFactor,
-                quality
+                easeFactor,
+                quality,
+                now
             ),
-            easeFactor=Model.updateEaseFactor(
-                phrase.easeFactor,
-                quality
-            )
+            easeFactor=easeFactor,
+            lastTimeSeen=now
         )
 
     @staticmethod
-    def convertDiacriticToNumber(pinyin: str) -> str:
-        """Given a character in pinyin with an accent, change it to the numbered form"""
-        result = ""
-        i = 0
-        while i < len(pinyin):
-            tone = Model.DIACRITIC_TO_TONE.get(pinyin[i])
-            if tone is None:
-                result += pinyin[i]
-                i += 1
-                continue
-            match tone:
-                case 1:
-                    result += Model.TONE1_DIACRITICS_TO_VOWEL[pinyin[i]]
-                case 2:
-                    result += Model.TONE2_DIACRITICS_TO_VOWEL[pinyin[i]]
-                case 3:
-                    result += Model.TONE3_DIACRITICS_TO_VOWEL[pinyin[i]]
-                case 4:
-                    result += Model.TONE4_DIACRITICS_TO_VOWEL[pinyin[i]]
-                case _:
-                    pass
-            result += pinyin[i+1:]
-            break
-        if tone is None:
-            tone = 5
-        return f"{result}{tone}"
-
-    @staticmethod
-    def getAnswerFromData(data: ChineseDataWithStats) -> str:
-        """Returns an answer string for the flashcard from the class"""
-        return data.pinyin
-    
-    @staticmethod
-    def getDetailsFromData(data: ChineseDataWithStats) -> str:
-        """Returns a details string for the flashcard from the class"""
-        return data.english
-
-    @staticmethod
-    def getPinyinBetweenTags(markup: str) -> str:
-        """Gets pinyin content between markup language tags"""
-        formattedAnswer = ""
-        for s in BeautifulSoup(markup, features="html.parser").find_all("span"):
-            formattedAnswer += Model.convertDiacriticToNumber(s.string)
-        return formattedAnswer
-
-    @staticmethod
-    def getPromptFromData(data: ChineseDataWithStats) -> str:
-        """Returns a prompt string for the flashcard from the class"""
-        if data.traditional != "":
-            return f"{data.simplified}|{data.traditional}"
-        else:
-            return f"{data.simplified}"
+    def getFlashcardFromData(data: ChineseDataWithStats) -> tuple[str, str, str]:
+        """Returns the (prompt, answer, details) strings for the flashcard from the class"""
+        prompt = f"{data.simplified}|{data.traditional}" if data.traditional != "" else data.simplified
+        return (prompt, data.pinyin, data.english)
 
     @staticmethod
     def getRandomLevel(levels: list[LEARNING_LEVEL], maximumBounds: dict[LEARNING_LEVEL, int]) -> LEARNING_LEVEL | None:
-        """Uniformly randomly retrieve a level index"""
+        """Randomly retrieve a level, weighted by how many phrases it has in bounds"""
         if len(levels) == 0:
             return None
 
-        r = random.randint(1, sum(v for v in maximumBounds.values()))
-        for l in levels:
-            mb = maximumBounds[l]
-            if r <= mb:
-                return l
-            else:
-                r = r - mb
-        return levels[-1] # Theoretically shouldn't be called but safety measure
+        # Only the given levels count towards the total, bounds may hold others
+        cumulativeBounds = list(accumulate(maximumBounds.get(l, 0) for l in levels))
+        if cumulativeBounds[-1] == 0: # Nothing to weigh by, safety measure
+            return levels[-1]
+        return random.choices(levels, cum_weights=cumulativeBounds)[0]
 
     @staticmethod
     def updateEaseFactor(oldEaseFactor: float, quality: QUALITY) -> float:
         """Returns new ease factor with clamping"""
-        match quality:
-            case QUALITY.FIVE:
-                return max(1.3, oldEaseFactor + 0.10)
-            case QUALITY.FOUR:
-                return max(1.3, oldEaseFactor + 0.00)
-            case QUALITY.THREE:
-                return max(1.3, oldEaseFactor - 0.14)
-            case QUALITY.TWO:
-                return max(1.3, oldEaseFactor - 0.32)
-            case QUALITY.ONE:
-                return max(1.3, oldEaseFactor - 0.54)
-            case QUALITY.ZERO:
-                return max(1.3, oldEaseFactor - 0.80)
-            case _:
-                return oldEaseFactor
+        change = Model.EASE_FACTOR_CHANGES.get(quality)
+        if change is None:
+            return oldEaseFactor
+        return max(Model.MIN_EASE_FACTOR, oldEaseFactor + change)
 
     @staticmethod
-    def updateDueDate(lastTimeSeen: str, oldDueDate: str, oldEaseFactor: float, quality: QUALITY) -> datetime.datetime:
-        """Provides the next due date in YYYY-MM-DD HH:MM:SS"""
+    def updateDueDate(
+            lastTimeSeen: str,
+            oldDueDate: str,
+            newEaseFactor: float,
+            quality: QUALITY,
+            now: datetime.datetime=None
+        ) -> datetime.datetime:
+        """
+        Provides the next due date in YYYY-MM-DD HH:MM:SS, counting from now if
+        given, spacing it out by the ease factor from updateEaseFactor()
+        """
+        if now is None:
+            now = datetime.datetime.now()
         # Check if user failed
         if quality in [QUALITY.ZERO, QUALITY.ONE, QUALITY.TWO]:
-            return datetime.datetime.now()
+            return now
         # Check if it's the first time this card has ever been seen
         if lastTimeSeen == "0" or lastTimeSeen == "" or oldDueDate == "0" or oldDueDate == "":
-            return datetime.datetime.now() + datetime.timedelta(days=1)
-        newEase = Model.updateEaseFactor(oldEaseFactor, quality)
+            return now + datetime.timedelta(days=1)
         lts = ChineseDB.formatTimeToDateTime(lastTimeSeen)
         odd = ChineseDB.formatTimeToDateTime(oldDueDate)
         delta = odd - lts
         interval = delta.days + round(delta.seconds / 86400)
         if interval <= 1:
-            return datetime.datetime.now() + datetime.timedelta(days=6)
+            return now + datetime.timedelta(days=6)
         else:
-            return datetime.datetime.now() + datetime.timedelta(days=int(interval*newEase))
+            return now + datetime.timedelta(days=int(interval*newEaseFactor))
 
     def calculateResponseTime(self, pauseTime: float=0) -> float:
         """Calculates how long it took the user to respond"""
-        pause = datetime.timedelta(seconds=pauseTime)
-        temp = datetime.datetime.now() - self.start - pause
-        return float(temp.seconds) + (temp.microseconds / 1000000)
+        return (self.end - self.start).total_seconds() - pauseTime
 
     def checkAnswer(self, userInput: str, pauseTime: float=0, ignoreTones: bool=False) -> tuple[ANSWER_STATE, QUALITY]:
         """
@@ -630,42 +642,45 @@ class Model(AbstractContextManager):
         wrong, they are put into an internal list of wrong answers and can
         be randomly chosen when calling getRandomPhraseInLevel(). To write them
         to the database, call flush()"""
-        # First, add to list of answered phrases and update response time
-        self.previouslyAnsweredPhrases.append(self.currentPhrase)
-        self._insertResponseTime(pauseTime)
+        self.end = datetime.datetime.now()
+        # Commit the response time and any phrase update together
+        with self.chineseDB.transaction():
+            # First, add to list of answered phrases and update response time
+            self.previouslyAnsweredPhrases.append(self.currentPhrase)
+            self._insertResponseTime(pauseTime)
+
+            # Create a dummy function to handle tone marks
+            if ignoreTones:
+                l = lambda s: s.translate(Model.TONE_NUMBER_DELETIONS)
+            else:
+                l = lambda s: s
 
-        # Create a dummy function to handle tone marks
-        if ignoreTones:
-            l = lambda s: "".join([c for c in s if not c.isdigit()])
-        else:
-            l = lambda s: s
-
-        # Pinyin has HTML tags so extract the element within
-        _userInput = l(userInput.lower().replace(' ',''))
-
-        # Check if user got it correct
-        if _userInput == l(Model.getPinyinBetweenTags(self.currentPhrase.pinyin).lower()):
-            # See if user has seen it before this session
-            if self.currentPhrase.id in [p.id for p in self.previouslyAnsweredPhrases]:
-                # Has seen it; see if user got it wrong during this session
-                if self.currentPhrase.id in self.incorrectPhrasesData:
-                    # Got it wrong before
-                    # Update DB saying user got it wrong before using old stored quality
-                    #   and return current quality
-                    self._updatePhrase(ANSWER_STATE.WRONG, self.incorrectPhrasesData.pop(self.currentPhrase.id))
+            # Fold the input the same way answers were when they were stored
+            _userInput = l(userInput.casefold().translate(Model.ANSWER_FOLDS))
+
+            # Check if user got it correct
+            if _userInput == l(self.currentAnswer):
+                # See if user has seen it before this session
+                if self.currentPhrase.id in [p.id for p in self.previouslyAnsweredPhrases]:
+                    # Has seen it; see if user got it wrong during this session
+                    if self.currentPhrase.id in self.incorrectPhrasesData:
+                        # Got it wrong before
+                        # Update DB saying user got it wrong before using old stored quality
+                        #   and return current quality
+                        self._updatePhrase(ANSWER_STATE.WRONG, self.incorrectPhrasesData.pop(self.currentPhrase.id))
+                        return (ANSWER_STATE.CORRECT, self._assessQuality(ANSWER_STATE.CORRECT))
+                    # Has seen it but didn't get it wrong before
+                    # No DB update, return current quality
                     return (ANSWER_STATE.CORRECT, self._assessQuality(ANSWER_STATE.CORRECT))
-                # Has seen it but didn't get it wrong before
-                # No DB update, return current quality
-                return (ANSWER_STATE.CORRECT, self._assessQuality(ANSWER_STATE.CORRECT))
-            # Has not seen it before
-            # Update DB and return current quality
-            quality = self._assessQuality(ANSWER_STATE.CORRECT)
-            self._updatePhrase(ANSWER_STATE.CORRECT, quality)
-            return (ANSWER_STATE.CORRECT, quality)
+                # Has not seen it before
+                # Update DB and return current quality
+                quality = self._assessQuality(ANSWER_STATE.CORRECT)
+                self._updatePhrase(ANSWER_STATE.CORRECT, quality)
+                return (ANSWER_STATE.CORRECT, quality)
         
-        # Not correct, check against homonyms
-        for p in self.phrasesWithSameLogographs:
-            if _userInput == l(Model.getPinyinBetweenTags(p.pinyin).lower()):
+            # Not correct, check against homonyms
+            homonymAnswers = self.homonymAnswersToneless if ignoreTones else self.homonymAnswers
+            if _userInput in homonymAnswers:
                 # See if user has seen it before this session
                 if self.currentPhrase.id in [p.id for p in self.previouslyAnsweredPhrases]:
                     # Has seen it; see if user got it wrong during this session
@@ -684,12 +699,12 @@ class Model(AbstractContextManager):
                 self._updatePhrase(ANSWER_STATE.HOMONYM, quality)
                 return (ANSWER_STATE.HOMONYM, quality)
         
-        # Boowomp, put into a list to be called again until user gets it right
-        quality = self._assessQuality(ANSWER_STATE.WRONG)
-        if self.currentPhrase.id not in self.incorrectPhrasesData:
-            # First time wrong, add to list
-            self.incorrectPhrasesData[self.currentPhrase.id] = quality
-        return (ANSWER_STATE.WRONG, quality)
+            # Boowomp, put into a list to be called again until user gets it right
+            quality = self._assessQuality(ANSWER_STATE.WRONG)
+            if self.currentPhrase.id not in self.incorrectPhrasesData:
+                # First time wrong, add to list
+                self.incorrectPhrasesData[self.currentPhrase.id] = quality
+            return (ANSWER_STATE.WRONG, quality)
 
     def clear(self) -> None:
         """Clears list of prevoiusly answered questions"""
@@ -703,6 +718,7 @@ class Model(AbstractContextManager):
     def deleteEntry(self) -> None:
         """Removes entry from testing pool"""
         self.chineseDB.deletePhrase(self.currentPhrase.id)
+        self.invalidatePhraseCache()
 
     def endSession(self) -> None:
         """
@@ -718,16 +734,18 @@ class Model(AbstractContextManager):
         weren't able to correct themselves. This should be called before
         closing the database for the session
         """
-        for id, quality in self.incorrectPhrasesData.items():
-            self._updateDatabaseDuringFlush(id, quality)
+        now = datetime.datetime.now()
+        with self.chineseDB.transaction():
+            for id, quality in self.incorrectPhrasesData.items():
+                self._updateDatabaseDuringFlush(id, quality, now)
 
     def getFirstPhraseInLevel(self, level: LEARNING_LEVEL) -> tuple[str, int]:
         """Returns the first phrase in a level and its index"""
-        return (self.vocabularies[level][0], 1)
+        return (self.vocabulary[self.vocabularyRanges[level][0]], 1)
 
     def getLastPhraseInLevel(self, level: LEARNING_LEVEL) -> tuple[str, int]:
         """Returns the last phrase in a level and its index"""
-        return (self.vocabularies[level][-1], self.maximums[level])
+        return (self.vocabulary[self.vocabularyRanges[level][1] - 1], self.maximums[level])
 
     def getPhraseByID(self, id: int) -> ChineseDataWithStats | None:
         """Gets phrase by given id"""
@@ -735,7 +753,11 @@ class Model(AbstractContextManager):
 
     def getPhraseInLevel(self, level: LEARNING_LEVEL, vocabIndex: int) -> str:
         """Returns specified phrase from the initially provided vocabulary file"""
-        return self.vocabularies[level][vocabIndex]
+        start, end = self.vocabularyRanges[level]
+        # Every level shares one list, so an index outside the level would read a neighbouring one
+        if not 0 <= vocabIndex < end - start:
+            raise IndexError(f"{level.name} has no phrase at index {vocabIndex}")
+        return self.vocabulary[start + vocabIndex]
 
     def getPreviouslyAnsweredPhrase(self) -> ChineseDataWithStats | None:
         """Retrieves previously answered phrase if exists"""
@@ -764,9 +786,8 @@ class Model(AbstractContextManager):
         numPDT = 0
         numPDTs = {}
         for level in learningLevels:
-            temp = self.chineseDB.getPhrasesDueTodayCount(level, maximumBounds.get(level, 0))
-            numPDT += temp
             numPDTs[level] = self.chineseDB.getPhrasesDueTodayCount(level, maximumBounds.get(level, 0))
+            numPDT += numPDTs[level]
         if numPDT + numI == 0:
             # Forced to try and pick a random phrase from the database
             # Note: this may return None if there really are no other choices
@@ -776,9 +797,12 @@ class Model(AbstractContextManager):
 
         # We have some phrases in the incorrect/due today bank
         # Test a chance just to choose a new unseen card instead or chug through old cards
-        if random.random() >= self.newUnseenCardChance:
-            # Failed chance, pick one incorrect phrases or from ones due today
-            if random.randint(1, numI + numPDT) <= numI:
+        chance = self.newUnseenCardChance
+        r = random.random()
+        if r >= chance:
+            # Failed chance, pick one incorrect phrases or from ones due today,
+            # reusing the rest of the same draw (still uniform over [0, 1)) to decide
+            if (r - chance) / (1 - chance) * (numI + numPDT) < numI:
                 # Choose from incorrect phrases
                 print(f"Incorrect phrase")
                 return self.getRandomIncorrectPhrase()
@@ -795,20 +819,33 @@ class Model(AbstractContextManager):
 
     def getRandomPhraseInLevel(self, level: LEARNING_LEVEL, maximumBound: int, limit: int=None) -> ChineseDataWithStats | None:
         """Returns a random phrase in (chinese, pinyin, details) from specified learning level and maximum bound"""
-        phrases = self.chineseDB.getPhrases(level, maximumBound, limit)
-        if len(phrases) == 0: # No phrases
+        # Fetch the whole level once, then any bound is just a prefix of it
+        cached = self.phraseIdsCache.get(level)
+        if cached is None:
+            pairs = self.chineseDB.getPhraseOrdinalIds(level)
+            cached = self.phraseIdsCache[level] = ([o for o, _ in pairs], [id for _, id in pairs])
+        ordinalIDs, ids = cached
+        numIds = bisect_right(ordinalIDs, maximumBound)
+        if limit is not None:
+            numIds = min(numIds, limit)
+        if numIds == 0: # No phrases
             return None
-        self._intializePhraseVariables(random.choice(phrases))
+        self._intializePhraseVariables(self.chineseDB.getPhraseById(ids[random.randrange(numIds)]))
         return self.currentPhrase
 
     def getRandomPhraseDueTodayInLevel(self, level: LEARNING_LEVEL, maximumBound: int, limit: int=None) -> ChineseDataWithStats | None:
         """Returns a random phrase in (chinese, pinyin, details) that's due today from specified learning levels and bounds"""
-        phrases = self.chineseDB.getPhrasesDueToday(level, maximumBound, limit)
-        if len(phrases) == 0: # No phrases
+        id = self.chineseDB.getRandomPhraseIdDueToday(level, maximumBound, limit)
+        if id is None: # No phrases
             return None
-        self._intializePhraseVariables(random.choice(phrases))
+        self._intializePhraseVariables(self.chineseDB.getPhraseById(id))
         return self.currentPhrase
 
+    def invalidatePhraseCache(self) -> None:
+        """Forgets which phrases each level can draw from and which are homonyms"""
+        self.phraseIdsCache.clear()
+        self.homonymsCache.clear()
+
     def open(self) -> bool:
         """Opens database connection"""
         if not self.chineseDB.isOpen():
@@ -817,6 +854,13 @@ class Model(AbstractContextManager):
 class Controller(AbstractContextManager):
     """Links view to model"""
 
+    # How the View reveals the answer for each result of checking it
+    ANSWER_DISPLAYS = {
+        ANSWER_STATE.CORRECT:   View.setAnswerCorrect,
+        ANSWER_STATE.WRONG:     View.setAnswerWrong,
+        ANSWER_STATE.HOMONYM:   View.unhideAnswer
+    }
+
     def __init__(
             self, 
             model: Model, 
@@ -829,14 +873,27 @@ class Controller(AbstractContextManager):
         self.model = model
         self.view  = view
         self.learningLevels = learningLevels
+        # Position of each level in learningLevels, so checkbox handling needn't search for it
+        self.learningLevelIndices = {level: i for i, level in enumerate(learningLevels)}
         self.ignoreTones = ignoreTones
         self.iniFile = iniFile
 
         self._did_iniReadFail = False
+        # Settings as last read from or written to the .ini, to skip rewriting them unchanged
+        self.iniSettings: dict[str, str] = {}
         self.activeLearningLevels: list[LEARNING_LEVEL] = []
         self.activeLearningLevelEndRanges: dict[LEARNING_LEVEL, int] = {}
         self.hasChecked = False
         self.pauseTime = 0.0
+        # Dragging a slider emits a tick per value, so ticks are collected
+        # and the labels updated at most once every SLIDER_UPDATE_DELAY ms
+        self.pendingSliderValues: dict[LEARNING_LEVEL, int] = {}
+        self.sliderTimer = QTimer()
+        self.sliderTimer.setSingleShot(True)
+        self.sliderTimer.setInterval(SLIDER_UPDATE_DELAY)
+        # Restarted by each flashQuality() so only the latest flash clears the quality
+        self.qualityTimer = QTimer()
+        self.qualityTimer.setSingleShot(True)
 
         # Set up initialization state
         self._read_ini() # Will set things to default if no .ini given
@@ -857,19 +914,21 @@ class Controller(AbstractContextManager):
         try:
             yield
         finally:
-            temp = datetime.datetime.now() - start
-            self.pauseTime += float(temp.seconds) + (temp.microseconds / 1000000)
+            self.pauseTime += (datetime.datetime.now() - start).total_seconds()
 
     def _connectSignalAndSlots(self) -> None:
         """Hooks up model to view"""
         # Setup view
         for level in self.learningLevels:
-            self.view.checkboxes[level].clicked.connect(
-                self.manageLearningLevels(level)
+            row = self.view.rows[level.value]
+            row.checkbox.clicked.connect(
+                functools.partial(self.manageLearningLevels, level)
             )
-            self.view.sliders[level].valueChanged.connect(
-                self.updateLabel(LABEL_SIDE.END, level)
+            row.slider.valueChanged.connect(
+                functools.partial(self.queueSliderValue, level)
             )
+        self.sliderTimer.timeout.connect(self.updatePendingLabels)
+        self.qualityTimer.timeout.connect(self.view.clearQuality)
         self.view.buttonBegin.clicked.connect(self.beginTesting)
 
         # Testing view
@@ -890,22 +949,29 @@ class Controller(AbstractContextManager):
 
     def _initializeSetupView(self) -> None:
         """In the View's setup view, give the first and last phrases"""
-        for level in self.learningLevels:
-            if level in self.activeLearningLevels:
-                self.view.setCheckBoxState(level, True)
-            else:
-                self.view.setCheckBoxState(level, False)
-            firstPhrase, firstIndex = self.model.getFirstPhraseInLevel(level)
-            self.view.setLabel(LABEL_SIDE.START, level, firstPhrase, firstIndex)
-            lastPhrase, lastIndex = self.model.getLastPhraseInLevel(level)
-            self.view.setSliderMaximum(level, lastIndex)
-            self.view.setSliderPosition(level, self.activeLearningLevelEndRanges[level])
-            self.view.setLabel(
-                LABEL_SIDE.END,
-                level,
-                self.model.getPhraseInLevel(level, self.activeLearningLevelEndRanges[level]-1),
-                self.activeLearningLevelEndRanges[level]
-            )
+        with self.view.batchSetupUpdates():
+            for level in self.learningLevels:
+                if level in self.activeLearningLevels:
+                    self.view.setCheckBoxState(level, True)
+                else:
+                    self.view.setCheckBoxState(level, False)
+                firstPhrase, firstIndex = self.model.getFirstPhraseInLevel(level)
+                self.view.setLabel(LABEL_SIDE.START, level, firstPhrase, firstIndex)
+                lastPhrase, lastIndex = self.model.getLastPhraseInLevel(level)
+                self.view.setSliderMaximum(level, lastIndex)
+                self.view.setSliderPosition(level, self.activeLearningLevelEndRanges[level])
+                self.view.setLabel(
+                    LABEL_SIDE.END,
+                    level,
+                    self.model.getPhraseInLevel(level, self.activeLearningLevelEndRanges[level]-1),
+                    self.activeLearningLevelEndRanges[level]
+                )
+
+    def _failReadingIni(self, reason: str) -> None:
+        """Tells the user why the .ini couldn't be used and falls back to default settings"""
+        self._did_iniReadFail = True
+        createErrorMessage(self.view, f"{reason} Setting to default settings.")
+        self._initializeDefaultLearningLevels()
 
     def _read_ini(self) -> None:
         """Parses .ini for its data"""
@@ -913,53 +979,50 @@ class Controller(AbstractContextManager):
             self._initializeDefaultLearningLevels()
             return
         if not Path(self.iniFile).is_file():
-            self._did_iniReadFail = True
-            createErrorMessage(self.view, "Error", f"Unable to find {self.iniFile}. Please check file name. Setting to default settings.")
-            self._initializeDefaultLearningLevels()
-            return
+            return self._failReadingIni(f"Unable to find {self.iniFile}. Please check file name.")
         # Attempt to read
         config = configparser.ConfigParser()
-        result = config.read(self.iniFile)
+        try:
+            result = config.read(self.iniFile)
+        except configparser.Error: # Not laid out as an .ini at all
+            result = []
         if len(result) == 0: # Failed to parse, set to defaults
-            self._did_iniReadFail = True
-            createErrorMessage(self.view, "Error", f"Unable to read {self.iniFile}. Please check its configuration. Setting to default settings.")
-            self._initializeDefaultLearningLevels()
-            return
+            return self._failReadingIni(f"Unable to read {self.iniFile}. Please check its configuration.")
         # Parse data
+        defaults = config["DEFAULT"]
         for l in self.learningLevels:
-            match config["DEFAULT"].getboolean(f"{l.name}_IsActive"):
-                case True:
-                    self.activeLearningLevels.append(l)
-                case False:
-                    pass
-                case _: # Was likely a None, thus call failed
-                    self._did_iniReadFail = True
-                    createErrorMessage(self.view, "Error", f"Unable to parse {self.iniFile} for section {l.name}_IsActive. Please check its configuration. Setting to default settings.")
-                    self._initializeDefaultLearningLevels()
-                    return
-            match r := config["DEFAULT"].getint(f"{l.name}_EndRange"):
-                case int():
-                    self.activeLearningLevelEndRanges[l] = r
-                case _: # Was likely a None, thus call failed
-                    self._did_iniReadFail = True
-                    createErrorMessage(self.view, "Error", f"Unable to parse {self.iniFile} for section {l.name}_EndRange. Please check its configuration. Setting to default settings.")
-                    self._initializeDefaultLearningLevels()
-                    return
+            try: # Both are None when missing
+                isActive = defaults.getboolean(f"{l.name}_IsActive")
+                endRange = defaults.getint(f"{l.name}_EndRange")
+            except ValueError: # Present but not a boolean or int
+                isActive = endRange = None
+            if isActive is None or endRange is None:
+                return self._failReadingIni(f"Unable to parse {self.iniFile} for {l.name}. Please check its configuration.")
+            if isActive:
+                self.activeLearningLevels.append(l)
+            # Kept within the level, as the slider would
+            self.activeLearningLevelEndRanges[l] = min(max(endRange, 1), self.model.maximums[l])
+        self.iniSettings = dict(defaults)
 
     def _write_ini(self) -> None:
         """Writes current state to .ini for next time"""
         if self.iniFile is None or self._did_iniReadFail:
             return
         config = configparser.ConfigParser()
+        defaults = config["DEFAULT"]
         for l in self.learningLevels:
             if l in self.activeLearningLevels:
-                config["DEFAULT"][f"{l.name}_IsActive"] = "True"
-                config["DEFAULT"][f"{l.name}_EndRange"] = f"{self.view.getSliderPosition(l)}"
+                defaults[f"{l.name}_IsActive"] = "True"
+                defaults[f"{l.name}_EndRange"] = f"{self.view.getSliderPosition(l)}"
             else:
-                config["DEFAULT"][f"{l.name}_IsActive"] = "False"
-                config["DEFAULT"][f"{l.name}_EndRange"] = "1"
+                defaults[f"{l.name}_IsActive"] = "False"
+                defaults[f"{l.name}_EndRange"] = "1"
+        settings = dict(defaults)
+        if settings == self.iniSettings: # Nothing changed this session
+            return
         with open(self.iniFile, 'w') as configHandle:
             config.write(configHandle)
+        self.iniSettings = settings
 
     def beginTesting(self) -> None:
         if len(self.activeLearningLevels) == 0: # All were checked off
@@ -968,6 +1031,10 @@ class Controller(AbstractContextManager):
             messageBox.setText("Please select at least one level")
             messageBox.exec()
             return
+        # Apply slider moves still waiting on the timer, so testing uses them
+        if self.sliderTimer.isActive():
+            self.sliderTimer.stop()
+            self.updatePendingLabels()
         self.view.loadTestingView()
         self.loadNextQuestion()
 
@@ -978,15 +1045,9 @@ class Controller(AbstractContextManager):
         self.hasChecked = True
         answer, quality = self.model.checkAnswer(self.view.getInput(), self.pauseTime, self.ignoreTones)
         self.view.setQuality(quality)
-        match answer:
-            case ANSWER_STATE.CORRECT:
-                self.view.setAnswerCorrect()
-            case ANSWER_STATE.WRONG:
-                self.view.setAnswerWrong()
-            case ANSWER_STATE.HOMONYM:
-                self.view.unhideAnswer()
-            case _:
-                pass
+        showAnswer = Controller.ANSWER_DISPLAYS.get(answer)
+        if showAnswer is not None:
+            showAnswer(self.view)
 
     def deleteEntry(self) -> None:
         """Deletes currently shown entry"""
@@ -1019,7 +1080,7 @@ class Controller(AbstractContextManager):
     def flashQuality(self, /, delay: int=1000) -> None:
         """Shows quality on screen briefly"""
         self.view.showQuality()
-        QTimer.singleShot(delay, self.view.clearQuality)
+        self.qualityTimer.start(delay)
 
     def loadNextQuestion(self) -> None:
         """Fetches next question and loads it to view"""
@@ -1029,39 +1090,26 @@ class Controller(AbstractContextManager):
             createErrorMessage(self.view, "No phrases were found in the levels and selections provided. Please expand the scope or add to the database.")
             self.returnToSetupView()
             return
-        prompt = Model.getPromptFromData(data)
-        answer = Model.getAnswerFromData(data)
-        details = Model.getDetailsFromData(data)
-        self.view.loadNextQuestion(prompt, answer, details)
+        self.view.loadNextQuestion(*Model.getFlashcardFromData(data))
         self.hasChecked = False
 
-    def manageLearningLevels(self, level: LEARNING_LEVEL) -> Callable[[], None]:
+    def manageLearningLevels(self, level: LEARNING_LEVEL, checked: bool) -> None:
         """
         Ensure that there are no gaps in learning levels, i.e. if level 4 is
         checked, levels 1-3 are checked and levels 5+ are unchecked"""
-        def dummy() -> None:
-            if self.view.getCheckBoxState(level): # If newly checked
+        # Active levels are always a prefix of the learning levels
+        i = self.learningLevelIndices[level]
+        with self.view.batchSetupUpdates():
+            if checked: # If newly checked
                 # Check all lower level check boxes
-                self.activeLearningLevels = []
-                for l in self.learningLevels:
-                    if l == level: # Found the ceiling
-                        self.activeLearningLevels.append(l)
-                        break
-                    self.activeLearningLevels.append(l)
+                self.activeLearningLevels = self.learningLevels[:i+1]
+                for l in self.learningLevels[:i]:
                     self.view.setCheckBoxState(l, True)
             else: # If newly unchecked
                 # Uncheck all higher level check boxes
-                self.activeLearningLevels = []
-                found = False
-                for l in self.learningLevels:
-                    if not found:
-                        if l == level:
-                            found = True
-                            continue
-                        self.activeLearningLevels.append(l)
-                        continue
+                self.activeLearningLevels = self.learningLevels[:i]
+                for l in self.learningLevels[i+1:]:
                     self.view.setCheckBoxState(l, False)
-        return dummy
 
     def nextQuestion(self) -> None:
         """
@@ -1084,12 +1132,15 @@ class Controller(AbstractContextManager):
             with self._trackPauseTime():
                 createErrorMessage(self.view, "No more previous answers", "Error: Cannot go back")
             return
-        prompt = Model.getPromptFromData(data)
-        answer = Model.getAnswerFromData(data)
-        details = Model.getDetailsFromData(data)
-        self.view.loadNextQuestion(prompt, answer, details)
+        self.view.loadNextQuestion(*Model.getFlashcardFromData(data))
         self.hasChecked = False
 
+    def queueSliderValue(self, level: LEARNING_LEVEL, value: int) -> None:
+        """Remembers a slider's latest value until the next label update"""
+        self.pendingSliderValues[level] = value
+        if not self.sliderTimer.isActive():
+            self.sliderTimer.start()
+
     def returnPressed(self) -> None:
         """
         Special functionality for Enter button. Either check pinyin or go to
@@ -1108,32 +1159,49 @@ class Controller(AbstractContextManager):
         """Return to setup view"""
         self.view.loadSetupView()
 
-    def updateLabel(self, labelSide: LABEL_SIDE, learningLevel: LEARNING_LEVEL) -> Callable[[], None]:
+    def updatePendingLabels(self) -> None:
+        """Relabels every slider that moved since the last update and takes it as the level's end range"""
+        for level, value in self.pendingSliderValues.items():
+            self.activeLearningLevelEndRanges[level] = value
+            self.updateLabel(LABEL_SIDE.END, level, value)
+        self.pendingSliderValues.clear()
+
+    def updateLabel(self, labelSide: LABEL_SIDE, learningLevel: LEARNING_LEVEL, value: int) -> None:
         """When the slider was moved, changed what value the label shows"""
-        def dummy() -> None:
-            value = self.view.getSliderPosition(learningLevel)
-            self.view.setLabel(
-                labelSide, 
-                learningLevel, 
-                self.model.getPhraseInLevel(learningLevel, value-1), 
-                value
-            )
-        return dummy
+        self.view.setLabel(
+            labelSide, 
+            learningLevel, 
+            self.model.getPhraseInLevel(learningLevel, value - 1),
+            value
+        )
 
 def main(argv: list[str], argc: int) -> None:
-    databaseFile = argv[1]
-    vocabularyFiles = argv[2:]
+    # Qt takes out its own options (e.g. -platform, -style) before we see the rest
+    app = QApplication(argv)
+    parser = QCommandLineParser()
+    parser.setApplicationDescription("Quizzes Chinese vocabulary by asking for its pinyin")
+    parser.addHelpOption()
+    parser.addPositionalArgument("database", "SQLite database of phrases")
+    parser.addPositionalArgument("vocabularies", "Vocabulary file for each HSK band, in order", "[vocabularies...]")
+    parser.process(app)
+    args = parser.positionalArguments()
+    if len(args) < 1:
+        parser.showHelp(errno.EINVAL)
+    databaseFile = args[0]
+    vocabularyFiles = args[1:]
     debugFile = "debug.txt"
 
-    app = QApplication([])
-    app.setStyleSheet("") # TODO
     view = View(WINDOW_WIDTH, WINDOW_HEIGHT)
+    # Paint the window before opening the database and reading vocabularies
+    view.show()
+    app.processEvents()
     with open(debugFile, 'a') as debugHandle:
         with redirect_stdout(debugHandle):
             with Model(databaseFile, vocabularyFiles) as model:
-                with Controller(model, view, [l for l in HSK_LEVEL], ignoreTones=False, iniFile="settings.ini"):
-                    view.show()
-                    sys.exit(app.exec())
+                with Controller(model, view, list(HSK_LEVELS), ignoreTones=False, iniFile="settings.ini"):
+                    result = app.exec()
+    # Only exit once the settings are written and the database and log closed
+    sys.exit(result)
 
 if __name__ == "__main__":
     main(sys.argv, len(sys.argv))
\ No newline at end of file